@@ -0,0 +1,368 @@
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+# SQLite ограничивает число параметров в одном запросе
+MAX_PARAMS = 900
+# Через сколько записей процесс проверяет, не пора ли чистить кэш
+CULL_EVERY = 100
+
+LOCK_KEY = 'lock:{}'
+STAMP_KEY = 'stamp:{}'
+
+
+def chunked(items, size=MAX_PARAMS):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех воркеров одного сервера.
+
+    Каждый процесс и поток открывает своё соединение, журнал WAL
+    позволяет читать параллельно с записью. `add` и `incr` атомарны
+    между процессами, поэтому на них держатся версии лент и
+    блокировки get_or_compute. Просроченные записи удаляются при
+    записи, когда их больше MAX_ENTRIES.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._sets = 0
+
+    def _connection(self):
+        # После fork соединение родителя использовать нельзя
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(self.path, timeout=20,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_expires '
+                               'ON cache (expires)')
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        result = {}
+        connection = self._connection()
+        now = time.time()
+        for chunk in chunked(keys):
+            placeholders = ', '.join('?' * len(chunk))
+            rows = connection.execute(
+                f'SELECT key, value FROM cache WHERE key IN ({placeholders}) '
+                'AND (expires IS NULL OR expires > ?)',
+                (*chunk, now),
+            )
+            for key, value in rows:
+                result[keys[key]] = pickle.loads(value)
+        return result
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = [(self._key(key, version), self._dumps(value),
+                 self.get_backend_timeout(timeout))
+                for key, value in data.items()]
+        if not rows:
+            return []
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                rows,
+            )
+        self._sets += len(rows)
+        if self._sets >= CULL_EVERY:
+            self._sets = 0
+            self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires '
+                'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+                (key, self._dumps(value), self.get_backend_timeout(timeout),
+                 time.time()),
+            )
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute('UPDATE cache SET value = ? WHERE key = ?',
+                               (self._dumps(value), key))
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        connection = self._connection()
+        with connection:
+            for chunk in chunked(keys):
+                placeholders = ', '.join('?' * len(chunk))
+                connection.execute(
+                    f'DELETE FROM cache WHERE key IN ({placeholders})', chunk
+                )
+
+    def clear(self):
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM cache')
+
+    def _cull(self, connection):
+        """Удаляет просроченное, а при переполнении — часть старых записей."""
+        with connection:
+            connection.execute('DELETE FROM cache WHERE expires <= ?',
+                               (time.time(),))
+            count = connection.execute(
+                'SELECT COUNT(*) FROM cache'
+            ).fetchone()[0]
+            if count > self._max_entries:
+                connection.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                    'ORDER BY expires IS NULL, expires LIMIT ?)',
+                    (count // self._cull_frequency,),
+                )
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, cache=None):
+    """Берёт значение из кэша, а при промахе считает его один раз.
+
+    Пересчитывает только тот, кто первым взял блокировку через
+    атомарный `add`. Остальные ждут готовое значение до
+    CACHE_LOCK_TIMEOUT секунд и лишь потом считают сами, поэтому
+    истёкший горячий ключ не пересчитывают все воркеры разом.
+    """
+    cache = cache or default_cache
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock_key = LOCK_KEY.format(key)
+    lock_timeout = settings.CACHE_LOCK_TIMEOUT
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(settings.CACHE_LOCK_POLL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+    finally:
+        # Чужую блокировку не снимаем: её держатель ещё считает
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+class LocalCache:
+    """LRU в памяти процесса с ограничением по числу записей и байтам.
+
+    Записи живут не дольше LOCAL_CACHE_TIMEOUT секунд. Размер записи
+    считается по длине pickle при сохранении. Попадания, промахи и
+    занятая память попадают в metrics.local_cache_stats.
+    """
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] <= time.monotonic():
+                self._pop(key)
+                item = None
+            if item is None:
+                metrics.local_cache_stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            metrics.local_cache_stats['hits'] += 1
+            return item[2]
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = settings.LOCAL_CACHE_TIMEOUT
+        try:
+            size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            size = sys.getsizeof(value)
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic() + timeout, size, value)
+            self.size += size
+            while self._data and (
+                len(self._data) > settings.LOCAL_CACHE_MAX_ENTRIES
+                or self.size > settings.LOCAL_CACHE_MAX_BYTES
+            ):
+                self._pop(next(iter(self._data)))
+            self._report()
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+            self._report()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+            self._report()
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def _report(self):
+        metrics.local_cache_stats['entries'] = len(self._data)
+        metrics.local_cache_stats['bytes'] = self.size
+
+
+local_cache = LocalCache()
+
+
+def get_stamp(name):
+    """Версия данных `name` из общего кэша, в процессе — на пару секунд.
+
+    Пропавшая версия заводится от текущего времени, чтобы не совпасть
+    ни с одной из прежних. Другие воркеры видят сдвиг версии не позже
+    чем через LOCAL_CACHE_STAMP_TIMEOUT секунд.
+    """
+    key = STAMP_KEY.format(name)
+    stamp = local_cache.get(key)
+    if stamp is None:
+        stamp = default_cache.get(key)
+        if stamp is None:
+            default_cache.add(key, time.time_ns(), None)
+            stamp = default_cache.get(key)
+        local_cache.set(key, stamp, settings.LOCAL_CACHE_STAMP_TIMEOUT)
+    return stamp
+
+
+def bump_stamp(name):
+    """Сдвигает версию `name`, после чего старые записи не читаются."""
+    key = STAMP_KEY.format(name)
+    try:
+        default_cache.incr(key)
+    except ValueError:
+        pass
+    local_cache.delete(key)
+
+
+def get_local(key, compute, stamp=None, timeout=DEFAULT_TIMEOUT,
+              lock=True):
+    """Значение из памяти процесса, общего кэша или compute().
+
+    С `stamp` в ключ входит версия get_stamp(stamp), поэтому
+    bump_stamp сбрасывает записи во всех воркерах сразу. В памяти
+    процесса значение живёт не дольше `timeout` и LOCAL_CACHE_TIMEOUT.
+    С lock=False промах считается без блокировки get_or_compute: для
+    дешёвых выборок, которые могут кончиться Http404, запрос
+    несуществующего объекта тогда ничего не пишет в общий кэш.
+    """
+    if stamp is not None:
+        key = f'{key}@{get_stamp(stamp)}'
+    value = local_cache.get(key)
+    if value is None:
+        if lock:
+            value = get_or_compute(key, compute, timeout)
+        else:
+            value = default_cache.get(key)
+            if value is None:
+                value = compute()
+                default_cache.set(key, value, timeout)
+        local_timeout = settings.LOCAL_CACHE_TIMEOUT
+        if timeout not in (DEFAULT_TIMEOUT, None):
+            local_timeout = min(timeout, local_timeout)
+        local_cache.set(key, value, local_timeout)
+    return value
+
+
+def clear_caches():
+    """Очищает общий кэш и кэш в памяти текущего процесса."""
+    default_cache.clear()
+    local_cache.clear()
@@ -0,0 +1,169 @@
+import threading
+from bisect import bisect_left
+from collections import Counter
+from time import perf_counter
+
+from django.template.base import Template
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+# Кэш в памяти процесса (core.cache.LocalCache) на весь воркер
+local_cache_stats = Counter(hits=0, misses=0, entries=0, bytes=0)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS_MS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.wall_ms = Histogram()
+        self.db_ms = Histogram()
+        self.template_ms = Histogram()
+        self.queries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class RequestStats:
+    """Счётчики одного запроса; живут в thread-local на время запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (perf_counter() - started) * 1000
+            self.queries += 1
+
+
+registry = {}
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request(view_name, wall_ms):
+    stats = _local.__dict__.pop('stats', None)
+    if stats is None:
+        return
+    with _lock:
+        metrics = registry.get(view_name)
+        if metrics is None:
+            metrics = registry[view_name] = ViewMetrics()
+        metrics.wall_ms.observe(wall_ms)
+        metrics.db_ms.observe(stats.db_ms)
+        metrics.template_ms.observe(stats.template_ms)
+        metrics.queries += stats.queries
+        metrics.cache_hits += stats.cache_hits
+        metrics.cache_misses += stats.cache_misses
+
+
+def current():
+    return getattr(_local, 'stats', None)
+
+
+def record_cache(hit):
+    """Учитывает обращение к кэшу в текущем запросе."""
+    stats = current()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def install_template_timer():
+    """Оборачивает Template.render, чтобы мерить время рендеринга.
+
+    Вложенные шаблоны ({% include %}, {% extends %}) входят во время
+    внешнего и отдельно не считаются.
+    """
+    original = Template.render
+    if getattr(original, 'timed', False):
+        return
+
+    def render(self, context):
+        stats = current()
+        if stats is None or stats.rendering:
+            return original(self, context)
+        stats.rendering = True
+        started = perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            stats.template_ms += (perf_counter() - started) * 1000
+            stats.rendering = False
+
+    render.timed = True
+    Template.render = render
+
+
+def export():
+    """Отдаёт накопленные метрики в текстовом формате Prometheus."""
+    lines = []
+    with _lock:
+        items = sorted(registry.items())
+        histograms = (
+            ('yatube_request_duration_ms', 'wall_ms'),
+            ('yatube_db_duration_ms', 'db_ms'),
+            ('yatube_template_duration_ms', 'template_ms'),
+        )
+        for metric, attr in histograms:
+            lines.append(f'# TYPE {metric} histogram')
+            for view, metrics in items:
+                histogram = getattr(metrics, attr)
+                total = 0
+                for bound, count in zip(BUCKETS_MS + ('+Inf',),
+                                        histogram.counts):
+                    total += count
+                    lines.append(f'{metric}_bucket{{view="{view}",'
+                                 f'le="{bound}"}} {total}')
+                lines.append(f'{metric}_sum{{view="{view}"}} '
+                             f'{histogram.sum:.3f}')
+                lines.append(f'{metric}_count{{view="{view}"}} '
+                             f'{histogram.count}')
+        counters = (
+            ('yatube_db_queries_total', 'queries'),
+            ('yatube_cache_hits_total', 'cache_hits'),
+            ('yatube_cache_misses_total', 'cache_misses'),
+        )
+        for metric, attr in counters:
+            lines.append(f'# TYPE {metric} counter')
+            for view, metrics in items:
+                lines.append(f'{metric}{{view="{view}"}} '
+                             f'{getattr(metrics, attr)}')
+    local = (
+        ('yatube_local_cache_hits_total', 'counter', 'hits'),
+        ('yatube_local_cache_misses_total', 'counter', 'misses'),
+        ('yatube_local_cache_entries', 'gauge', 'entries'),
+        ('yatube_local_cache_bytes', 'gauge', 'bytes'),
+    )
+    for metric, kind, name in local:
+        lines.append(f'# TYPE {metric} {kind}')
+        lines.append(f'{metric} {local_cache_stats[name]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,34 @@
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+
+class PerformanceMiddleware:
+    """Собирает время ответа, SQL, рендеринг и кэш по имени URL."""
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS:
+            raise MiddlewareNotUsed
+        metrics.install_template_timer()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = perf_counter()
+        stats = metrics.start_request()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            try:
+                response = self.get_response(request)
+            finally:
+                match = request.resolver_match
+                metrics.finish_request(
+                    match.view_name if match else 'unresolved',
+                    (perf_counter() - started) * 1000
+                )
+        return response
@@ -0,0 +1,120 @@
+import gzip
+import logging
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (HashedFilesMixin,
+                                                ManifestStaticFilesStorage)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # brotli не обязателен: без него будут только .gz
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Хэш содержимого, который ManifestStaticFilesStorage вставляет в имя
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def compress_variants(data):
+    """Сжатые копии файла: (расширение, байты), только если они меньше."""
+    variants = [('.gz', gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data)))
+    return [(suffix, compressed) for suffix, compressed in variants
+            if len(compressed) < len(data)]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хэшем в имени и заранее сжатыми копиями .gz и .br.
+
+    Копии готовятся при collectstatic для текстовых файлов из
+    STATIC_COMPRESS_EXTENSIONS. Если файла нет в манифесте (статика
+    ещё не собрана), шаблоны получают адрес без хэша, а не ошибку.
+    """
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted({*paths, *self.hashed_files.values()}):
+            if not name.endswith(settings.STATIC_COMPRESS_EXTENSIONS):
+                continue
+            with self.open(name) as original:
+                data = original.read()
+            if len(data) < settings.STATIC_COMPRESS_MIN_SIZE:
+                continue
+            for suffix, compressed in compress_variants(data):
+                with open(self.path(name) + suffix, 'wb') as target:
+                    target.write(compressed)
+                yield name, name + suffix, True
+
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            logger.warning('Файл статики %s не собран collectstatic', name)
+            return super(HashedFilesMixin, self).url(name)
+
+
+def accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encodings = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00'):
+            continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def serve_static(request, path):
+    """Отдаёт файл из STATIC_ROOT, выбирая сжатую копию по Accept-Encoding.
+
+    Файлы с хэшем в имени кэшируются навсегда (immutable), остальные —
+    на STATIC_MAX_AGE секунд с проверкой If-Modified-Since.
+    """
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    stat = os.stat(fullpath)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    content_type, _ = mimetypes.guess_type(fullpath)
+    encodings = accepted_encodings(request)
+    encoding = None
+    for coding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if coding in encodings and os.path.isfile(fullpath + suffix):
+            encoding, fullpath = coding, fullpath + suffix
+            break
+    response = FileResponse(
+        open(fullpath, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        response['Cache-Control'] = (
+            f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+    return response
@@ -0,0 +1,59 @@
+import logging
+import os
+from time import perf_counter
+
+from django.template import TemplateSyntaxError, engines
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def get_engine():
+    return engines['django'].engine
+
+
+def cached_loaders(engine):
+    return [loader for loader in engine.template_loaders
+            if isinstance(loader, CachedLoader)]
+
+
+def iter_template_names(engine):
+    """Имена всех шаблонов из каталогов DIRS движка."""
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if name.endswith(TEMPLATE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, directory).replace(os.sep,
+                                                                   '/')
+
+
+def warm_up_templates():
+    """Компилирует все шаблоны проекта в кэш cached loader.
+
+    Возвращает число скомпилированных шаблонов; без cached loader
+    прогревать нечего, и функция ничего не делает.
+    """
+    engine = get_engine()
+    if not cached_loaders(engine):
+        return 0
+    started = perf_counter()
+    compiled = 0
+    for name in iter_template_names(engine):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            logger.exception('Не удалось скомпилировать шаблон %s', name)
+        else:
+            compiled += 1
+    logger.info('Скомпилировано шаблонов: %s за %.1f мс',
+                compiled, (perf_counter() - started) * 1000)
+    return compiled
+
+
+def reset_templates():
+    """Сбрасывает кэш шаблонов, как будто процесс только запущен."""
+    for loader in cached_loaders(get_engine()):
+        loader.reset()
@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from .. import metrics
+from ..cache import (LOCK_KEY, LocalCache, SQLiteCache, bump_stamp,
+                     clear_caches, get_local, get_or_compute)
+
+
+def make_cache(path, **options):
+    return SQLiteCache(path, {'OPTIONS': options})
+
+
+def compute_shared(path, results):
+    cache = make_cache(path)
+
+    def compute():
+        cache.incr('computed')
+        time.sleep(0.3)
+        return 'page'
+
+    results.put(get_or_compute('hot', compute, 60, cache))
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = make_cache(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_values_are_shared_between_instances(self):
+        other = make_cache(self.path)
+        self.cache.set('key', {'html': 'текст'})
+        self.cache.set_many({'a': 1, 'b': 2})
+
+        self.assertEqual(other.get('key'), {'html': 'текст'})
+        self.assertEqual(other.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_values_are_missing(self):
+        self.cache.set('key', 'value', 60)
+        self.cache.set('old', 'value', -1)
+
+        self.assertTrue(self.cache.has_key('key'))
+        self.assertIsNone(self.cache.get('old'))
+        self.assertFalse(self.cache.has_key('old'))
+
+    def test_add_replaces_only_expired_values(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.cache.set('old', 1, -1)
+        self.assertTrue(self.cache.add('old', 2))
+
+        self.assertEqual(self.cache.get_many(['key', 'old']),
+                         {'key': 1, 'old': 2})
+
+    def test_incr(self):
+        self.cache.set('version', 1, None)
+
+        self.assertEqual(self.cache.incr('version'), 2)
+        self.assertEqual(make_cache(self.path).incr('version', 3), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_cull_keeps_max_entries(self):
+        cache = make_cache(self.path, MAX_ENTRIES=50, CULL_FREQUENCY=2)
+        cache.set_many({f'key{i}': i for i in range(120)})
+
+        self.assertLessEqual(len(cache.get_many(f'key{i}'
+                                                for i in range(120))), 60)
+
+
+@override_settings(CACHE_LOCK_TIMEOUT=5, CACHE_LOCK_POLL=0.01)
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = make_cache(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hot_key_is_computed_by_one_process(self):
+        self.cache.set('computed', 0, None)
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [context.Process(target=compute_shared,
+                                   args=(self.path, results))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(10)
+
+        self.assertEqual([results.get(timeout=1) for _ in workers],
+                         ['page'] * 4)
+        self.assertEqual(self.cache.get('computed'), 1)
+        self.assertIsNone(self.cache.get(LOCK_KEY.format('hot')))
+
+    @override_settings(CACHE_LOCK_TIMEOUT=0.05)
+    def test_computes_itself_when_lock_holder_is_stuck(self):
+        self.cache.add(LOCK_KEY.format('hot'), 1, 60)
+
+        value = get_or_compute('hot', lambda: 'page', 60, self.cache)
+
+        self.assertEqual(value, 'page')
+        self.assertEqual(self.cache.get('hot'), 'page')
+        self.assertIsNotNone(self.cache.get(LOCK_KEY.format('hot')))
+
+
+@override_settings(LOCAL_CACHE_MAX_ENTRIES=3,
+                   LOCAL_CACHE_MAX_BYTES=10000,
+                   LOCAL_CACHE_TIMEOUT=30)
+class LocalCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocalCache()
+        metrics.local_cache_stats.clear()
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for key in 'abc':
+            self.cache.set(key, key)
+        self.cache.get('a')
+        self.cache.set('d', 'd')
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual([self.cache.get(key) for key in 'acd'],
+                         ['a', 'c', 'd'])
+
+    def test_size_is_bounded_in_bytes(self):
+        self.cache.set('big', 'x' * 6000)
+        self.cache.set('huge', 'x' * 6000)
+
+        self.assertIsNone(self.cache.get('big'))
+        self.assertLessEqual(self.cache.size, 10000)
+        self.assertEqual(metrics.local_cache_stats['entries'], 1)
+        self.assertEqual(metrics.local_cache_stats['bytes'], self.cache.size)
+
+    def test_expired_entry_is_missing(self):
+        self.cache.set('key', 'value', -1)
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(metrics.local_cache_stats['misses'], 1)
+
+    def test_hits_are_exported(self):
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+
+        self.assertIn('yatube_local_cache_hits_total 1', metrics.export())
+
+
+class GetLocalTests(SimpleTestCase):
+    def setUp(self):
+        clear_caches()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def test_value_is_computed_once_until_stamp_is_bumped(self):
+        self.assertEqual(get_local('key', self.compute, 'things'), 'value 1')
+        self.assertEqual(get_local('key', self.compute, 'things'), 'value 1')
+
+        bump_stamp('things')
+
+        self.assertEqual(get_local('key', self.compute, 'things'), 'value 2')
@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+
+class SQLitePragmasTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        settings_dict = dict(connection.settings_dict,
+                             NAME=os.path.join(self.directory.name,
+                                               'wal.sqlite3')
+                             )
+        self.wrapper = DatabaseWrapper(settings_dict, alias='wal_test')
+
+    def tearDown(self):
+        self.wrapper.close()
+        self.directory.cleanup()
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connection_uses_wal(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'DELETE'})
+    def test_pragmas_come_from_settings(self):
+        self.assertEqual(self.pragma('journal_mode'), 'delete')
@@ -0,0 +1,63 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.cache import clear_caches
+
+
+@override_settings(PERFORMANCE_METRICS=True, METRICS_TOKEN='secret',
+                   METRICS_ALLOWED_IPS=[])
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        metrics.registry.clear()
+
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        index = metrics.registry['posts:index']
+        self.assertEqual(index.wall_ms.count, 2)
+        self.assertGreater(index.queries, 0)
+        self.assertGreater(index.template_ms.sum, 0)
+        self.assertEqual((index.cache_hits, index.cache_misses), (1, 1))
+
+    def test_unresolved_urls_are_grouped(self):
+        self.client.get('/page_does_not_exist404/')
+        self.assertIn('unresolved', metrics.registry)
+
+    def test_metrics_endpoint_exports_histograms(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'),
+                                   HTTP_AUTHORIZATION='Bearer secret')
+
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
+        self.assertContains(
+            response,
+            'yatube_request_duration_ms_count{view="posts:index"} 1'
+        )
+        self.assertContains(
+            response, 'yatube_cache_misses_total{view="posts:index"} 1'
+        )
+
+    def test_metrics_endpoint_needs_token_or_allowed_ip(self):
+        url = reverse('metrics')
+        cases = (
+            ({}, 404),
+            ({'HTTP_AUTHORIZATION': 'Bearer wrong'}, 404),
+            ({'HTTP_AUTHORIZATION': 'Bearer secret'}, 200),
+        )
+        for headers, status in cases:
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(url, **headers).status_code,
+                                 status)
+        with self.settings(METRICS_ALLOWED_IPS=['10.0.0.1']):
+            response = self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(PERFORMANCE_METRICS=False)
+    def test_metrics_endpoint_is_off_when_disabled(self):
+        response = self.client.get(reverse('metrics'),
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 404)
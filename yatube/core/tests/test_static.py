@@ -0,0 +1,96 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..static import IMMUTABLE, brotli, serve_static
+
+STYLES = 'body { color: #333; }\n' * 100
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        source = os.path.join(self.directory.name, 'source')
+        self.root = os.path.join(self.directory.name, 'root')
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'app.css'), 'w') as styles:
+            styles.write(STYLES)
+        overrides = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[source],
+            STATICFILES_STORAGE=(
+                'core.static.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0,
+                     ignore_patterns=['admin'])
+        self.name = staticfiles_storage.stored_name('css/app.css')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get(self, path, **headers):
+        request = RequestFactory().get(f'/static/{path}', **headers)
+        return serve_static(request, path)
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        path = os.path.join(self.root, self.name)
+
+        self.assertRegex(self.name, r'^css/app\.[0-9a-f]{12}\.css$')
+        with gzip.open(path + '.gz', 'rt') as compressed:
+            self.assertEqual(compressed.read(), STYLES)
+        self.assertEqual(os.path.isfile(path + '.br'), brotli is not None)
+
+    @override_settings(DEBUG=False)
+    def test_template_url_points_to_hashed_file(self):
+        self.assertEqual(staticfiles_storage.url('css/app.css'),
+                         f'/static/{self.name}')
+        self.assertEqual(staticfiles_storage.url('css/missing.css'),
+                         '/static/css/missing.css')
+
+    def test_hashed_file_is_served_compressed_and_immutable(self):
+        response = self.get(self.name, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)),
+                         STYLES.encode())
+
+    @unittest.skipIf(brotli is None, 'brotli не установлен')
+    def test_brotli_is_preferred(self):
+        response = self.get(self.name, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_plain_file_without_accept_encoding(self):
+        response = self.get(self.name, HTTP_ACCEPT_ENCODING='gzip;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content),
+                         STYLES.encode())
+
+    @override_settings(STATIC_MAX_AGE=600)
+    def test_unhashed_file_is_revalidated(self):
+        response = self.get('css/app.css')
+
+        self.assertEqual(response['Cache-Control'], 'public, max-age=600')
+        not_modified = self.get(
+            'css/app.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_missing_and_outside_files_are_not_found(self):
+        for path in ('css/missing.css', '../source/css/app.css'):
+            with self.subTest(path=path):
+                with self.assertRaises(Http404):
+                    self.get(path)
@@ -0,0 +1,52 @@
+import copy
+import os
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from ..template_cache import (cached_loaders, get_engine,
+                              iter_template_names, reset_templates,
+                              warm_up_templates)
+
+
+def cached_templates():
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['APP_DIRS'] = False
+    templates[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    return templates
+
+
+def uncached_templates():
+    templates = copy.deepcopy(settings.TEMPLATES)
+    templates[0]['OPTIONS'].pop('loaders', None)
+    templates[0]['OPTIONS']['debug'] = True
+    return templates
+
+
+class TemplateWarmUpTests(SimpleTestCase):
+    @override_settings(TEMPLATES=uncached_templates())
+    def test_warm_up_is_noop_without_cached_loader(self):
+        self.assertEqual(warm_up_templates(), 0)
+
+    @override_settings(TEMPLATES=cached_templates())
+    def test_warm_up_compiles_every_project_template(self):
+        engine = get_engine()
+        names = list(iter_template_names(engine))
+        self.assertIn('base.html', names)
+        self.assertIn('includes/post_card.html', names)
+        self.assertTrue(all(
+            os.path.isfile(os.path.join(settings.TEMPLATES_DIR, name))
+            for name in names
+        ))
+
+        self.assertEqual(warm_up_templates(), len(names))
+        loader, = cached_loaders(engine)
+        self.assertIn('base.html', loader.get_template_cache)
+
+        reset_templates()
+        self.assertEqual(loader.get_template_cache, {})
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
 
 
 def page_not_found(request, exception):
@@ -13,3 +18,18 @@ def csrf_failure(request, reason=''):
 
 def internal_server_error(request):
     return render(request, '500.html', status=500)
+
+
+def can_see_metrics(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and constant_time_compare(header, f'Bearer {token}')
+
+
+def metrics_view(request):
+    if not settings.PERFORMANCE_METRICS or not can_see_metrics(request):
+        raise Http404
+    return HttpResponse(metrics.export(),
+                        content_type='text/plain; version=0.0.4')
@@ -1,15 +1,95 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 
 from .models import Group, Post, Comment, Follow
-
-
-class PostAdmin(admin.ModelAdmin):
+from .search import filter_posts
+from .utils import CursorPaginator, EstimatedCountPaginator, estimate_count
+
+CURSOR_VAR = 'after'
+PREVIOUS_CURSOR_VAR = 'before'
+
+
+class KeysetChangeList(ChangeList):
+    """Список объектов, который листается по курсору, а не по OFFSET.
+
+    Пока пользователь не выбрал сортировку по колонке, строки идут
+    от новых к старым по `cursor_field` админки, а страницы
+    переключаются токенами `after`/`before`.
+    """
+    keyset = False
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        lookup_params.pop(PREVIOUS_CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        if ORDER_VAR in self.params or self.show_all:
+            return super().get_results(request)
+        paginator = CursorPaginator(self.queryset,
+                                    self.list_per_page,
+                                    after=self.params.get(CURSOR_VAR),
+                                    before=self.params.get(
+                                        PREVIOUS_CURSOR_VAR),
+                                    field=self.model_admin.cursor_field
+                                    )
+        self.page = paginator.get_page()
+        self.keyset = True
+        self.result_count = estimate_count(self.queryset)
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = self.page.object_list
+        self.can_show_all = False
+        self.multi_page = self.page.has_other_pages()
+        self.paginator = paginator
+
+    def get_cursor_url(self, name, token):
+        return self.get_query_string({name: token},
+                                     [CURSOR_VAR, PREVIOUS_CURSOR_VAR])
+
+    def next_url(self):
+        return self.get_cursor_url(CURSOR_VAR, self.page.next_cursor)
+
+    def previous_url(self):
+        return self.get_cursor_url(PREVIOUS_CURSOR_VAR,
+                                   self.page.previous_cursor)
+
+    def first_url(self):
+        return self.get_query_string(remove=[CURSOR_VAR,
+                                             PREVIOUS_CURSOR_VAR])
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Админка для больших таблиц: без точных COUNT(*) и OFFSET.
+
+    date_hierarchy здесь не задаётся: для ссылок на годы и месяцы
+    он выполняет SELECT DISTINCT по дате через всю таблицу. Даты
+    выбираются фильтром-диапазоном из list_filter.
+    """
+    cursor_field = None
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'group', 'text', 'pub_date', 'author',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    list_editable = ('group',)
+    cursor_field = 'pub_date'
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 
@@ -23,10 +103,14 @@ class GroupAdmin(admin.ModelAdmin):
 admin.site.register(Group, GroupAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('author', 'text', 'created', 'post')
-    search_fields = ('text', 'created',)
+    list_select_related = ('author', 'post')
+    search_fields = ('text',)
     list_filter = ('created',)
+    cursor_field = 'created'
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
     empty_value_display = '-пусто-'
 
 
@@ -35,6 +119,8 @@ admin.site.register(Comment, CommentAdmin)
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
     empty_value_display = '-пусто-'
 
 
@@ -0,0 +1,200 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+
+from .feed import get_feed_queryset, get_follow_feed
+from .models import Comment, Group, Post
+from .utils import CursorPaginator
+
+User = get_user_model()
+
+# Поля ответа и соответствующие им пути в ORM
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+GROUP_FIELDS = ('title', 'slug', 'description')
+PROFILE_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'stats__posts_count',
+    'followers_count': 'stats__followers_count',
+    'following_count': 'stats__following_count',
+}
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def api_view(view):
+    """Отдаёт ошибки API в JSON с нужным статусом."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response({'error': 'Метод не поддерживается.'},
+                                 status=405)
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return json_response({'error': str(error)}, status=400)
+        except Http404:
+            return json_response({'error': 'Не найдено.'}, status=404)
+    return wrapper
+
+
+def get_fields(request, available):
+    """Разбирает ?fields=a,b; без параметра возвращает все поля."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name for name in raw.split(',') if name]
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise BadRequest('Неизвестные поля: {}.'.format(
+            ', '.join(sorted(unknown))
+        ))
+    return fields
+
+
+def select(queryset, fields, lookups, extra=()):
+    """Выбирает через values() только колонки запрошенных полей.
+
+    `extra` нужны курсору и в ответ не попадают.
+    """
+    paths = [lookups[name] for name in fields]
+    return queryset.values(*dict.fromkeys([*paths, *extra]))
+
+
+def serialize(row, fields, lookups):
+    data = {name: row[lookups[name]] for name in fields}
+    if data.get('image'):
+        data['image'] = settings.MEDIA_URL + data['image']
+    return data
+
+
+def page_url(request, **params):
+    query = request.GET.copy()
+    for name in ('after', 'before'):
+        query.pop(name, None)
+    query.update(params)
+    return f'{request.path}?{query.urlencode()}'
+
+
+def paginated(request, queryset, lookups, field='pub_date'):
+    """Страница по курсору из строк values() без моделей и COUNT(*)."""
+    fields = get_fields(request, lookups)
+    paginator = CursorPaginator(select(queryset, fields, lookups,
+                                       extra=('id', field)),
+                                settings.POSTS_PER_PAGE,
+                                after=request.GET.get('after'),
+                                before=request.GET.get('before'),
+                                field=field
+                                )
+    page = paginator.get_page()
+    return json_response({
+        'results': [serialize(row, fields, lookups) for row in page],
+        'next': (page_url(request, after=page.next_cursor)
+                 if page.has_next() else None),
+        'previous': (page_url(request, before=page.previous_cursor)
+                     if page.has_previous() else None),
+    })
+
+
+def get_group(slug):
+    group = Group.objects.filter(slug=slug).values(*GROUP_FIELDS).first()
+    if group is None:
+        raise Http404
+    return group
+
+
+def get_author_id(username):
+    author_id = (User.objects.filter(username=username).
+                 values_list('pk', flat=True).first())
+    if author_id is None:
+        raise Http404
+    return author_id
+
+
+@api_view
+def post_list(request):
+    return paginated(request, get_feed_queryset(), POST_FIELDS)
+
+
+@api_view
+def group_detail(request, slug):
+    return json_response(get_group(slug))
+
+
+@api_view
+def group_posts(request, slug):
+    if not Group.objects.filter(slug=slug).exists():
+        raise Http404
+    queryset = get_feed_queryset().filter(group__slug=slug)
+    return paginated(request, queryset, POST_FIELDS)
+
+
+@api_view
+def profile(request, username):
+    fields = get_fields(request, PROFILE_FIELDS)
+    row = (select(User.objects.filter(username=username),
+                  fields,
+                  PROFILE_FIELDS).
+           first()
+           )
+    if row is None:
+        raise Http404
+    data = serialize(row, fields, PROFILE_FIELDS)
+    for name in fields:
+        if name.endswith('_count') and data[name] is None:
+            data[name] = 0
+    return json_response(data)
+
+
+@api_view
+def profile_posts(request, username):
+    queryset = get_feed_queryset().filter(author=get_author_id(username))
+    return paginated(request, queryset, POST_FIELDS)
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = get_fields(request, POST_FIELDS)
+    row = select(Post.objects.filter(pk=post_id), fields, POST_FIELDS).first()
+    if row is None:
+        raise Http404
+    return json_response(serialize(row, fields, POST_FIELDS))
+
+
+@api_view
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    queryset = Comment.objects.filter(post=post_id)
+    return paginated(request, queryset, COMMENT_FIELDS, field='created')
+
+
+@api_view
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response({'error': 'Нужна авторизация.'}, status=401)
+    return paginated(request, get_follow_feed(request.user), POST_FIELDS)
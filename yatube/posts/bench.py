@@ -0,0 +1,210 @@
+import math
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from core.cache import clear_caches
+from core.template_cache import reset_templates, warm_up_templates
+
+from . import feed_cache
+from .counters import (recount_author_stats, recount_comments,
+                       recount_group_stats)
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .search import rebuild_index
+
+User = get_user_model()
+
+BENCH_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+
+
+def zipf_weights(size, alpha):
+    """Веса по закону Ципфа: первый элемент популярнее всех."""
+    return [1 / math.pow(rank, alpha) for rank in range(1, size + 1)]
+
+
+def chunks(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def seed(users=100, groups=20, posts=10000, comments=0, follows=0,
+         alpha=1.2, batch_size=10000):
+    """Быстро создаёт синтетические данные для замеров через bulk_create.
+
+    Авторы постов, комментариев и подписок выбираются с весами по закону
+    Ципфа, поэтому у немногих авторов много постов и подписчиков.
+    `batch_size` задаёт, сколько объектов держится в памяти за раз;
+    размер INSERT подбирает сам бэкенд базы. В конце пересчитываются
+    счётчики и поисковый индекс, которые bulk_create обходит.
+    """
+    prefix = User.objects.count()
+    User.objects.bulk_create(
+        [User(username=f'bench_{prefix + i}') for i in range(users)]
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith='bench_'
+    ).order_by('pk').values_list('pk', flat=True))
+    weights = zipf_weights(len(user_ids), alpha)
+
+    prefix = Group.objects.count()
+    Group.objects.bulk_create(
+        [Group(title=f'Группа {prefix + i}',
+               slug=f'bench-{prefix + i}',
+               description='') for i in range(groups)]
+    )
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-'
+    ).values_list('pk', flat=True)) + [None]
+
+    for start, size in chunks(posts, batch_size):
+        authors = random.choices(user_ids, weights, k=size)
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {start + i}',
+                  author_id=author_id,
+                  group_id=random.choice(group_ids))
+             for i, author_id in enumerate(authors)]
+        )
+
+    if comments and posts:
+        last_id = Post.objects.order_by('-pk').first().pk
+        post_ids = range(last_id - posts + 1, last_id + 1)
+        post_weights = zipf_weights(len(post_ids), alpha)
+        for start, size in chunks(comments, batch_size):
+            commented = random.choices(post_ids, post_weights, k=size)
+            Comment.objects.bulk_create(
+                [Comment(text=f'Комментарий {start + i}',
+                         author_id=random.choice(user_ids),
+                         post_id=post_id)
+                 for i, post_id in enumerate(commented)]
+            )
+
+    for start, size in chunks(follows, batch_size):
+        authors = random.choices(user_ids, weights, k=size)
+        Follow.objects.bulk_create(
+            [Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in zip(
+                 random.choices(user_ids, k=size), authors)
+             if user_id != author_id],
+            ignore_conflicts=True,
+        )
+
+    recount_author_stats()
+    recount_comments()
+    recount_group_stats()
+    rebuild_index()
+
+
+def percentile(values, share):
+    """Процентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(math.ceil(share * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def hit_ratio(hits, misses):
+    if not hits + misses:
+        return None
+    return round(hits / (hits + misses), 3)
+
+
+class QueryCounter:
+    """Считает SQL-запросы без ограничения на длину журнала запросов."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def get_bench_urls(page=1):
+    """Подбирает для каждой страницы самые нагруженные объекты."""
+    author = (AuthorStats.objects.order_by('-posts_count').
+              select_related('user').first())
+    follower = (AuthorStats.objects.order_by('-following_count').
+                select_related('user').first())
+    group = (Group.objects.annotate(posts=Count('group')).
+             order_by('-posts').first())
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    if not (author and follower and group and post):
+        return {}, None
+    query = f'?page={page}'
+    urls = {
+        'posts:index': reverse('posts:index') + query,
+        'posts:group_list': reverse('posts:group_list',
+                                    args=(group.slug,)) + query,
+        'posts:profile': reverse('posts:profile',
+                                 args=(author.user.username,)) + query,
+        'posts:post_detail': reverse('posts:post_detail', args=(post.pk,)),
+        'posts:follow_index': reverse('posts:follow_index') + query,
+    }
+    return urls, follower.user
+
+
+def run_benchmark(requests=50, page=1, cold=False, views=BENCH_VIEWS,
+                  warm_templates=False):
+    """Замеряет страницы через тестовый клиент и возвращает сводку.
+
+    Кэш шаблонов сначала сбрасывается, как у только что запущенного
+    воркера, поэтому `first_ms` — время первого запроса к странице
+    до и после прогрева шаблонов (`warm_templates`).
+
+    Для каждой страницы считаются p50/p95/среднее время ответа в мс,
+    медианное число SQL-запросов, размер ответа в байтах и доля
+    карточек постов, взятых из кэша. При `cold` кэш очищается перед
+    каждым запросом.
+    """
+    urls, follower = get_bench_urls(page)
+    if not urls:
+        return {}
+    client = Client()
+    client.force_login(follower)
+    reset_templates()
+    if warm_templates:
+        warm_up_templates()
+    report = {
+        'requests': requests,
+        'page': page,
+        'cold': cold,
+        'warm_templates': warm_templates,
+        'posts': Post.objects.count(),
+        'views': {},
+    }
+    for name in views:
+        timings, queries, sizes = [], [], []
+        feed_cache.stats.clear()
+        for _ in range(requests):
+            if cold:
+                clear_caches()
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                response = client.get(urls[name])
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+            sizes.append(len(response.content))
+        report['views'][name] = {
+            'url': urls[name],
+            'status': response.status_code,
+            'first_ms': round(timings[0], 3),
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': percentile(queries, 0.5),
+            'bytes': percentile(sizes, 0.5),
+            'card_hit_ratio': hit_ratio(feed_cache.stats['card_hits'],
+                                        feed_cache.stats['card_misses']),
+        }
+    return report
@@ -0,0 +1,187 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import (BooleanField, Case, Count, F, Max, Q, Value,
+                              When)
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Follow, Group, GroupStats, Post
+
+User = get_user_model()
+
+
+def get_author_stats(user):
+    """Возвращает счётчики пользователя, не создавая пустую запись."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def change_author_stats(user_id, **deltas):
+    """Сдвигает счётчики пользователя на заданные величины.
+
+    Запись заводится только при увеличении: при удалении пользователя
+    каскадом её уже может не быть, и создавать её заново нельзя.
+    Если подписчиков становится больше FOLLOW_FEED_FANOUT_LIMIT, тем же
+    UPDATE сбрасывается in_timelines: условие считается по значению
+    до изменения, поэтому параллельные подписки его не пропустят.
+    """
+    limit = settings.FOLLOW_FEED_FANOUT_LIMIT
+    changes = {name: Greatest(F(name) + delta, 0)
+               for name, delta in deltas.items()}
+    followers_delta = deltas.get('followers_count', 0)
+    if followers_delta > 0:
+        changes['in_timelines'] = Case(
+            When(followers_count__gt=limit - followers_delta,
+                 then=Value(False)),
+            default=F('in_timelines'),
+            output_field=BooleanField(),
+        )
+    updated = AuthorStats.objects.filter(user_id=user_id).update(**changes)
+    if not updated and min(deltas.values()) > 0:
+        AuthorStats.objects.get_or_create(
+            user_id=user_id,
+            defaults={**deltas, 'in_timelines': followers_delta <= limit},
+        )
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0)
+    )
+
+
+def recount_author_stats():
+    """Пересчитывает счётчики пользователей, возвращает число исправленных."""
+    posts = dict(Post.objects.order_by().
+                 values_list('author').annotate(Count('pk'))
+                 )
+    followers = dict(Follow.objects.order_by().
+                     values_list('author').annotate(Count('pk'))
+                     )
+    following = dict(Follow.objects.order_by().
+                     values_list('user').annotate(Count('pk'))
+                     )
+    existing = AuthorStats.objects.in_bulk()
+    changed, missing = [], []
+    for user_id in User.objects.values_list('pk', flat=True).iterator():
+        actual = (posts.get(user_id, 0),
+                  followers.get(user_id, 0),
+                  following.get(user_id, 0))
+        stats = existing.get(user_id)
+        if stats is None:
+            stats = AuthorStats(user_id=user_id)
+            missing.append(stats)
+        elif actual == (stats.posts_count,
+                        stats.followers_count,
+                        stats.following_count):
+            continue
+        else:
+            changed.append(stats)
+        (stats.posts_count,
+         stats.followers_count,
+         stats.following_count) = actual
+    AuthorStats.objects.bulk_create(missing)
+    AuthorStats.objects.bulk_update(
+        changed,
+        ('posts_count', 'followers_count', 'following_count'),
+        batch_size=1000,
+    )
+    AuthorStats.objects.filter(
+        followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT
+    ).update(in_timelines=False)
+    return len(changed) + len(missing)
+
+
+def recount_comments():
+    """Пересчитывает комментарии у постов, возвращает число исправленных."""
+    posts = list(Post.objects.
+                 order_by().
+                 annotate(actual=Count('parent_post')).
+                 filter(~Q(comments_count=F('actual'))).
+                 only('pk')
+                 )
+    for post in posts:
+        post.comments_count = post.actual
+    Post.objects.bulk_update(posts, ('comments_count',), batch_size=1000)
+    return len(posts)
+
+
+def get_group_stats(group):
+    try:
+        return group.stats
+    except GroupStats.DoesNotExist:
+        return GroupStats(group=group)
+
+
+def get_recent_posts(group_id):
+    """Id и даты последних постов группы по индексу (group, -pub_date)."""
+    return list(Post.objects.
+                filter(group_id=group_id).
+                order_by('-pub_date', '-pk').
+                values_list('pk', 'pub_date')
+                [:settings.GROUP_DIRECTORY_RECENT_POSTS]
+                )
+
+
+def change_group_stats(group_id, delta):
+    """Сдвигает число постов группы и обновляет её последние посты."""
+    recent = get_recent_posts(group_id)
+    changes = {
+        'last_post_at': recent[0][1] if recent else None,
+        'recent_post_ids': ','.join(str(pk) for pk, _ in recent),
+    }
+    updated = GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=Greatest(F('posts_count') + delta, 0), **changes
+    )
+    if not updated and Group.objects.filter(pk=group_id).exists():
+        GroupStats.objects.get_or_create(
+            group_id=group_id,
+            defaults={
+                'posts_count': Post.objects.filter(group_id=group_id).count(),
+                **changes,
+            },
+        )
+
+
+def recount_group_stats():
+    """Пересчитывает активность всех групп, возвращает число исправленных."""
+    counts = {
+        group_id: (posts, last_post_at)
+        for group_id, posts, last_post_at in Post.objects.
+        exclude(group=None).
+        order_by().
+        values_list('group').
+        annotate(Count('pk'), Max('pub_date'))
+    }
+    existing = GroupStats.objects.in_bulk()
+    changed, missing = [], []
+    for group_id in Group.objects.values_list('pk', flat=True).iterator():
+        posts, last_post_at = counts.get(group_id, (0, None))
+        recent_post_ids = ','.join(
+            str(pk) for pk, _ in get_recent_posts(group_id)
+        ) if posts else ''
+        actual = (posts, last_post_at, recent_post_ids)
+        stats = existing.get(group_id)
+        if stats is None:
+            stats = GroupStats(group_id=group_id)
+            missing.append(stats)
+        elif actual == (stats.posts_count,
+                        stats.last_post_at,
+                        stats.recent_post_ids):
+            continue
+        else:
+            changed.append(stats)
+        (stats.posts_count,
+         stats.last_post_at,
+         stats.recent_post_ids) = actual
+    GroupStats.objects.bulk_create(missing)
+    GroupStats.objects.bulk_update(
+        changed,
+        ('posts_count', 'last_post_at', 'recent_post_ids'),
+        batch_size=1000,
+    )
+    AuthorStats.objects.filter(
+        followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT
+    ).update(in_timelines=False)
+    return len(changed) + len(missing)
@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+FEED_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'thumbnail',
+    'author', 'author__username', 'author__first_name', 'author__last_name',
+    'group', 'group__title', 'group__slug',
+)
+
+
+def get_feed_queryset():
+    """Возвращает посты для лент вместе с автором и группой.
+
+    Автор и группа подтягиваются одним запросом, а колонки, которые
+    шаблоны лент не показывают, не выбираются.
+    """
+    return (Post.objects.
+            select_related('author', 'group').
+            only(*FEED_FIELDS).
+            order_by('-pub_date')
+            )
+
+
+def is_fanout_author(author):
+    """Проверяет, раздаётся ли автор по лентам при записи."""
+    followers = (AuthorStats.objects.
+                 filter(user=author).
+                 values_list('followers_count', flat=True).
+                 first()
+                 )
+    return (followers or 0) <= settings.FOLLOW_FEED_FANOUT_LIMIT
+
+
+def trim_timeline(user):
+    """Обрезает ленту пользователя до FOLLOW_FEED_MAX_LENGTH записей."""
+    stale = (TimelineEntry.objects.
+             filter(user=user).
+             values_list('pk', flat=True)[settings.FOLLOW_FEED_MAX_LENGTH:]
+             )
+    TimelineEntry.objects.filter(pk__in=list(stale)).delete()
+
+
+def trim_timelines():
+    """Обрезает все переполненные ленты, возвращает число обрезанных.
+
+    Лента читается не дальше FOLLOW_FEED_MAX_LENGTH записей, поэтому
+    лишние записи только занимают место: их убирает фоновая задача,
+    а не запись поста.
+    """
+    users = (TimelineEntry.objects.
+             order_by().
+             values_list('user').
+             annotate(entries=Count('pk')).
+             filter(entries__gt=settings.FOLLOW_FEED_MAX_LENGTH).
+             values_list('user', flat=True)
+             )
+    users = list(users)
+    for user_id in users:
+        trim_timeline(user_id)
+    return len(users)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_fanout_author(post.author):
+        return
+    followers = (Follow.objects.
+                 filter(author=post.author).
+                 values_list('user', flat=True)
+                 )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()],
+        ignore_conflicts=True,
+    )
+
+
+def add_author_posts(author_id, user_ids):
+    """Кладёт последние посты автора в ленты пользователей `user_ids`."""
+    posts = list(Post.objects.
+                 filter(author_id=author_id).
+                 order_by('-pub_date').
+                 values_list('pk', 'pub_date')
+                 [:settings.FOLLOW_FEED_MAX_LENGTH]
+                 )
+    for user_id in user_ids:
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+             for pk, pub_date in posts],
+            ignore_conflicts=True,
+        )
+
+
+def backfill_timeline(follow):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if not is_fanout_author(follow.author):
+        return
+    add_author_posts(follow.author_id, [follow.user_id])
+    trim_timeline(follow.user)
+
+
+def backfill_author(author_id):
+    """Раскладывает посты автора по лентам всех его подписчиков.
+
+    Нужна, когда число подписчиков опустилось до
+    FOLLOW_FEED_FANOUT_LIMIT: пока их было больше, посты автора
+    собирались при чтении и в ленты не попадали. Пишет до
+    FOLLOW_FEED_MAX_LENGTH записей на подписчика, поэтому вызывается
+    только из backfill_timelines, а не в запросе.
+    """
+    followers = (Follow.objects.
+                 filter(author_id=author_id).
+                 values_list('user', flat=True)
+                 )
+    add_author_posts(author_id, followers.iterator())
+
+
+def backfill_timelines(pending=False):
+    """Заполняет ленты подписчиков, возвращает число авторов.
+
+    Без `pending` проходит всех авторов с подписчиками: это нужно
+    после включения FOLLOW_FEED_FANOUT на базе, где подписки уже есть.
+    С `pending` — только тех, кто вернулся под FOLLOW_FEED_FANOUT_LIMIT
+    после сброса in_timelines; до этого их посты собираются при чтении.
+    """
+    limit = settings.FOLLOW_FEED_FANOUT_LIMIT
+    authors = AuthorStats.objects.filter(followers_count__gt=0,
+                                         followers_count__lte=limit)
+    if pending:
+        authors = authors.filter(in_timelines=False)
+    authors = list(authors.values_list('user', flat=True))
+    for author_id in authors:
+        backfill_author(author_id)
+        # Пока лента заполнялась, подписчиков могло снова стать больше
+        AuthorStats.objects.filter(
+            user_id=author_id, followers_count__lte=limit
+        ).update(in_timelines=True)
+    trim_timelines()
+    return len(authors)
+
+
+def drop_from_timeline(follow):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(user=follow.user,
+                                 post__author=follow.author
+                                 ).delete()
+
+
+def count_follow_feed(user):
+    """Число постов в ленте подписок по счётчикам авторов, без COUNT(*)."""
+    posts = (AuthorStats.objects.
+             filter(user__in=user.follower.values('author')).
+             aggregate(posts=Sum('posts_count'))['posts']
+             )
+    return posts or 0
+
+
+def get_follow_feed(user):
+    """Возвращает ленту подписок пользователя.
+
+    Посты обычных авторов читаются из готовой ленты. Посты авторов
+    с числом подписчиков больше FOLLOW_FEED_FANOUT_LIMIT, а также тех,
+    чьи ленты ещё не заполнил backfill_timelines, собираются при чтении.
+    """
+    authors = user.follower.all().values('author')
+    if not settings.FOLLOW_FEED_FANOUT:
+        return get_feed_queryset().filter(author__in=authors)
+    read_authors = (Q(followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT)
+                    | Q(in_timelines=False))
+    large_authors = (AuthorStats.objects.
+                     filter(read_authors, user__in=authors).
+                     values('user')
+                     )
+    timeline = (user.timeline.
+                values('post')[:settings.FOLLOW_FEED_MAX_LENGTH]
+                )
+    return get_feed_queryset().filter(
+        Q(pk__in=timeline) | Q(author__in=large_authors)
+    )
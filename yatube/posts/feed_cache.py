@@ -0,0 +1,221 @@
+import hashlib
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import metrics
+from core.cache import bump_stamp, get_local, get_stamp
+
+from .models import AuthorStats, Group, Post
+
+User = get_user_model()
+
+FEED_STAMP = 'posts:feed'
+GROUPS_STAMP = 'posts:groups'
+USERS_STAMP = 'posts:users'
+CARD_VERSION_KEY = 'posts:card_version:{}:{}'
+CARD_KEY = 'posts:card:{}:{}'
+
+stats = Counter(hits=0, misses=0, card_hits=0, card_misses=0)
+
+
+def get_feed_version():
+    """Возвращает текущую версию ленты, заводя её при первом обращении."""
+    return get_stamp(FEED_STAMP)
+
+
+def bump_feed_version():
+    """Сдвигает версию ленты, после чего старые фрагменты не читаются."""
+    bump_stamp(FEED_STAMP)
+
+
+def get_group(slug):
+    """Группа со счётчиками по slug из кэша процесса или базы.
+
+    Счётчики группы могут отставать на LOCAL_CACHE_TIMEOUT секунд,
+    паджинатор поправляет их по странице. Выборка по индексу дешёвая,
+    поэтому читается без блокировки, и адрес несуществующей группы
+    не пишет в общий кэш.
+    """
+    return get_local(
+        f'posts:group:{slug}',
+        lambda: get_object_or_404(Group.objects.select_related('stats'),
+                                  slug=slug
+                                  ),
+        GROUPS_STAMP,
+        settings.LOCAL_CACHE_TIMEOUT,
+        lock=False,
+    )
+
+
+def get_author(username):
+    """Пользователь по username из кэша процесса или базы.
+
+    Объект общий для запросов воркера, поэтому в нём нет пароля
+    и связанных счётчиков: их страница читает отдельно. Как и группа,
+    читается без блокировки.
+    """
+    return get_local(
+        f'posts:user:{username}',
+        lambda: get_object_or_404(
+            User.objects.only('id', 'username', 'first_name', 'last_name'),
+            username=username,
+        ),
+        USERS_STAMP,
+        settings.LOCAL_CACHE_TIMEOUT,
+        lock=False,
+    )
+
+
+def bump_card_version(kind, pk):
+    """Сдвигает версию карточек поста, автора или группы."""
+    try:
+        cache.incr(CARD_VERSION_KEY.format(kind, pk))
+    except ValueError:
+        pass
+
+
+def get_card_keys(posts):
+    """Ключи карточек с версиями поста, автора и группы.
+
+    Версии читаются одним get_many. Пропавшая из кэша версия
+    заводится заново от текущего времени, поэтому старая карточка
+    не может вернуться.
+    """
+    parts = {post.pk: (CARD_VERSION_KEY.format('post', post.pk),
+                       CARD_VERSION_KEY.format('user', post.author_id),
+                       CARD_VERSION_KEY.format('group', post.group_id))
+             for post in posts}
+    versions = cache.get_many({key for keys in parts.values()
+                               for key in keys})
+    missing = {key for keys in parts.values() for key in keys
+               if key not in versions}
+    if missing:
+        initial = time.time_ns()
+        for key in missing:
+            cache.add(key, initial, None)
+        versions.update(cache.get_many(missing))
+    return {pk: CARD_KEY.format(pk, '.'.join(str(versions.get(key, 0))
+                                             for key in keys))
+            for pk, keys in parts.items()}
+
+
+def render_post_cards(posts):
+    """Кладёт в post.card_html карточки постов из кэша или рендерит их.
+
+    Карточка не зависит от пользователя, поэтому рендерится без
+    запроса и контекстных процессоров.
+    """
+    posts = list(posts)
+    keys = get_card_keys(posts)
+    cached = cache.get_many(keys.values())
+    rendered = {}
+    for post in posts:
+        key = keys[post.pk]
+        html = cached.get(key)
+        metrics.record_cache(html is not None)
+        if html is None:
+            stats['card_misses'] += 1
+            html = render_to_string('includes/post_card.html',
+                                    {'post': post})
+            rendered[key] = html
+        else:
+            stats['card_hits'] += 1
+        post.card_html = mark_safe(html)
+    cache.set_many(rendered, settings.POSTS_CARD_CACHE_TIMEOUT)
+
+
+def render_post_list(request, page_obj):
+    """Отдаёт HTML списка постов страницы из кэша или рендерит его.
+
+    Ключ строится из версии ленты и запрошенной страницы, поэтому
+    в кэш не попадает ничего, что зависит от пользователя. Вместе
+    со списком кэшируется и навигация, так что при попадании
+    ленивая `page_obj` не выбирается из базы. После сдвига версии
+    страницу рендерит один воркер, остальные ждут его, а готовый
+    HTML держится и в памяти процесса.
+    """
+    key = 'posts:index:{}:{}:{}:{}'.format(
+        get_feed_version(),
+        request.GET.get('page', ''),
+        request.GET.get('after', ''),
+        request.GET.get('before', ''),
+    )
+    rendered = False
+
+    def render():
+        nonlocal rendered
+        rendered = True
+        render_post_cards(page_obj)
+        return mark_safe(''.join(
+            render_to_string(template, {'page_obj': page_obj}, request)
+            for template in ('includes/post_list.html',
+                             'includes/paginator.html')
+        ))
+
+    html = get_local(key, render,
+                     timeout=settings.POSTS_FEED_CACHE_TIMEOUT)
+    metrics.record_cache(not rendered)
+    stats['misses' if rendered else 'hits'] += 1
+    return html
+
+
+def make_etag(request, *parts):
+    """Собирает ETag из версии ленты, пользователя и параметров запроса.
+
+    Страницы содержат шапку и формы текущего пользователя, поэтому
+    он входит в тег наравне с данными. Страницы автора добавляют
+    версию его карточек, чтобы смена имени сбрасывала тег.
+    """
+    raw = '|'.join(str(part) for part in (
+        get_feed_version(),
+        request.user.pk or 0,
+        request.GET.urlencode(),
+        *parts,
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_etag(request, *args, **kwargs):
+    return make_etag(request)
+
+
+def get_card_version(kind, pk):
+    """Версия карточек объекта, заводится так же, как в get_card_keys."""
+    key = CARD_VERSION_KEY.format(kind, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def profile_etag(request, username):
+    stats = (AuthorStats.objects.
+             filter(user__username=username).
+             values_list('user_id', 'posts_count', 'followers_count').
+             first()
+             )
+    if stats is None:
+        return None
+    return make_etag(request, username, *stats,
+                     get_card_version('user', stats[0]))
+
+
+def post_detail_etag(request, post_id):
+    counts = (Post.objects.
+              filter(pk=post_id).
+              values_list('author_id', 'comments_count',
+                          'author__stats__posts_count').
+              first()
+              )
+    if counts is None:
+        return None
+    return make_etag(request, post_id, *counts,
+                     get_card_version('user', counts[0]))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import backfill_timelines, trim_timelines
+
+
+class Command(BaseCommand):
+    help = ('Заполняет ленты подписок после включения FOLLOW_FEED_FANOUT '
+            'или для авторов, вернувшихся под FOLLOW_FEED_FANOUT_LIMIT, '
+            'и обрезает переполненные ленты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending', action='store_true',
+            help='Только авторы, вернувшиеся под FOLLOW_FEED_FANOUT_LIMIT '
+                 '(для периодического запуска).',
+        )
+        parser.add_argument(
+            '--trim-only', action='store_true',
+            help='Только обрезать ленты до FOLLOW_FEED_MAX_LENGTH '
+                 '(для периодического запуска).',
+        )
+
+    def handle(self, *args, **options):
+        if options['trim_only']:
+            trimmed = trim_timelines()
+            self.stdout.write(self.style.SUCCESS(
+                f'Обрезано лент: {trimmed}'
+            ))
+            return
+        authors = backfill_timelines(pending=options['pending'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты заполнены постами авторов: {authors}'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import make_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для постов с картинкой, у которых их нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Перестроить миниатюры всех постов.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnail='')
+        built = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            make_thumbnail(post_id)
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Построено миниатюр: {built}'))
@@ -0,0 +1,106 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+
+from posts.bench import seed
+from posts.feed import get_feed_queryset
+from posts.models import Comment, Post
+from yatube.settings import POSTS_PER_PAGE
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Показывает планы EXPLAIN и время запросов лент '
+            'с составными индексами, а с --drop-indexes и без них.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Сначала создать столько постов.')
+        parser.add_argument('--comments', type=int, default=0,
+                            help='Сколько комментариев создать с --seed.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Сколько раз выполнять каждый запрос.')
+        parser.add_argument('--drop-indexes', action='store_true',
+                            help='Сравнить с планами без индексов. Индексы '
+                                 'удаляются в откатываемой транзакции, но '
+                                 'до отката таблицы заблокированы: только '
+                                 'для тестовой базы.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            seed(posts=options['seed'], comments=options['comments'])
+        queries = self.feed_queries()
+        if not queries:
+            self.stderr.write('Нет данных: запустите с --seed.')
+            return
+        if options['drop_indexes']:
+            self.stderr.write(self.style.WARNING(
+                'Индексы лент удаляются до конца замера, запросы к постам '
+                'и комментариям в это время ждут.'
+            ))
+            try:
+                with transaction.atomic():
+                    self.drop_indexes()
+                    self.report('без индексов', queries, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+        self.report('с индексами', queries, options['repeat'])
+
+    def feed_queries(self):
+        top_author = self.most_common(Post.objects, 'author')
+        top_group = self.most_common(Post.objects.exclude(group=None),
+                                     'group')
+        top_post = self.most_common(Comment.objects.exclude(post=None),
+                                    'post')
+        if top_author is None:
+            return {}
+        feeds = get_feed_queryset()
+        queries = {
+            'index': feeds,
+            'profile': feeds.filter(author=top_author),
+            'follow_index': feeds.filter(author__in=[top_author]),
+        }
+        if top_group is not None:
+            queries['group_posts'] = feeds.filter(group=top_group)
+        if top_post is not None:
+            queries['comments'] = (Comment.objects.
+                                   filter(post=top_post).
+                                   select_related('author').
+                                   order_by('-created', '-pk')
+                                   )
+        return {name: queryset[:POSTS_PER_PAGE]
+                for name, queryset in queries.items()}
+
+    def most_common(self, queryset, field):
+        row = (queryset.
+               order_by().
+               values_list(field).
+               annotate(rows=Count('pk')).
+               order_by('-rows').
+               first()
+               )
+        return row and row[0]
+
+    def drop_indexes(self):
+        with connection.cursor() as cursor:
+            for model in (Post, Comment):
+                for index in model._meta.indexes:
+                    cursor.execute('DROP INDEX {}'.format(
+                        connection.ops.quote_name(index.name)
+                    ))
+
+    def report(self, title, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== {title} =='))
+        for name, queryset in queries.items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / repeat * 1000
+            self.stdout.write(f'{name}: {elapsed:.2f} мс')
+            self.stdout.write(queryset.explain())
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import export_rows
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки '
+            'в NDJSON, по одной записи на строку.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-',
+                            help='Файл для выгрузки, по умолчанию stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Сколько строк читать из базы за раз.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['output'] == '-':
+            rows = export_rows(self.stdout, options['chunk_size'])
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                rows = export_rows(stream, options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено строк: {rows}, '
+            f'{rows / max(elapsed, 1e-9):.0f} строк/с'
+        ))
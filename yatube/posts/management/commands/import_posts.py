@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Post
+from posts.transfer import import_rows
+
+
+class Command(BaseCommand):
+    help = ('Загружает NDJSON, выгруженный export_posts, пачками '
+            'bulk_create. Загружать нужно в базу без постов: записи не '
+            'сверяются с существующими, и повторный импорт их удвоит.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', default='-',
+                            help='Файл с данными, по умолчанию stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько строк сохранять одной пачкой.')
+
+    def handle(self, *args, **options):
+        if Post.objects.exists():
+            raise CommandError('В базе уже есть посты: повторный импорт '
+                               'создаст дубликаты.')
+        if options['input'] == '-':
+            rows, skipped, elapsed = import_rows(sys.stdin,
+                                                 options['batch_size'])
+        else:
+            with open(options['input'], encoding='utf-8') as stream:
+                rows, skipped, elapsed = import_rows(stream,
+                                                     options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {rows} за {elapsed:.1f} с, '
+            f'{rows / max(elapsed, 1e-9):.0f} строк/с'
+        ))
+        if skipped:
+            self.stderr.write(self.style.WARNING(
+                f'Пропущено комментариев к постам не из файла: {skipped}'
+            ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает поисковый индекс постов, например после '
+            'bulk_create в обход сигналов.')
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import (recount_author_stats, recount_comments,
+                            recount_group_stats)
+from posts.models import Comment, Post
+from posts.utils import refresh_table_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики постов, подписчиков, комментариев '
+            'и активность групп, обновляет статистику для оценки '
+            'числа строк.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            authors = recount_author_stats()
+            posts = recount_comments()
+            groups = recount_group_stats()
+        refresh_table_stats(Post, Comment)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {authors}, '
+            f'постов {posts}, групп {groups}'
+        ))
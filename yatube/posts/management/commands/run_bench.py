@@ -0,0 +1,42 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bench import BENCH_VIEWS, run_benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет ленты и страницу поста через тестовый клиент '
+            'и печатает p50/p95, число запросов и размер ответа в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Сколько запросов к каждой странице.')
+        parser.add_argument('--page', type=int, default=1,
+                            help='Номер страницы лент.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--warm-templates', action='store_true',
+                            help='Прогреть кэш шаблонов перед замером.')
+        parser.add_argument('--view', action='append', choices=BENCH_VIEWS,
+                            help='Замерить только эти страницы.')
+        parser.add_argument('--output', help='Записать JSON в файл.')
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write('DEBUG включён: debug toolbar исказит замеры, '
+                              'запускайте с DEBUG=0.')
+        report = run_benchmark(requests=options['requests'],
+                               page=options['page'],
+                               cold=options['cold'],
+                               views=options['view'] or BENCH_VIEWS,
+                               warm_templates=options['warm_templates'])
+        if not report:
+            raise CommandError('Нет данных: сначала запустите seed_bench.')
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
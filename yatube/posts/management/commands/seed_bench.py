@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.bench import seed
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетических пользователей, группы, посты, '
+            'комментарии и подписки для замеров производительности.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='Показатель степени закона Ципфа.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed(users=options['users'],
+                 groups=options['groups'],
+                 posts=options['posts'],
+                 comments=options['comments'],
+                 follows=options['follows'],
+                 alpha=options['alpha'],
+                 batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Данные для замеров созданы'))
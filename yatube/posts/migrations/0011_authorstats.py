@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    stats = []
+    for user in User.objects.annotate(
+        posts=models.Count('author', distinct=True),
+        followers=models.Count('following', distinct=True),
+        follows=models.Count('follower', distinct=True),
+    ).iterator():
+        stats.append(AuthorStats(user_id=user.pk,
+                                 posts_count=user.posts,
+                                 followers_count=user.followers,
+                                 following_count=user.follows))
+    AuthorStats.objects.bulk_create(stats, batch_size=1000)
+    for post in Post.objects.order_by().annotate(
+        comments=models.Count('parent_post')
+    ).filter(comments__gt=0).iterator():
+        Post.objects.filter(pk=post.pk).update(comments_count=post.comments)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='posts/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5(text)'
+        )
+        schema_editor.execute(
+            'INSERT INTO posts_post_fts (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX posts_post_text_search_idx ON posts_post '
+            "USING GIN (to_tsvector('russian', text))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX posts_post_text_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_thumbnail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
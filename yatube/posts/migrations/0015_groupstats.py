@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+RECENT_POSTS = 3
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    stats = []
+    for group in Group.objects.order_by().annotate(
+        posts=models.Count('group'),
+        last_post_at=models.Max('group__pub_date'),
+    ).iterator():
+        recent = (Post.objects.
+                  filter(group=group).
+                  order_by('-pub_date', '-pk').
+                  values_list('pk', flat=True)[:RECENT_POSTS])
+        stats.append(GroupStats(group_id=group.pk,
+                                posts_count=group.posts,
+                                last_post_at=group.last_post_at,
+                                recent_post_ids=','.join(map(str, recent))))
+    GroupStats.objects.bulk_create(stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('last_post_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний пост')),
+                ('recent_post_ids', models.CharField(blank=True, help_text='id через запятую, новые первыми', max_length=200, verbose_name='Последние посты')),
+            ],
+            options={
+                'verbose_name': 'Активность группы',
+                'verbose_name_plural': 'Активность групп',
+            },
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_large_authors(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT
+    ).update(in_timelines=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_groupstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='in_timelines',
+            field=models.BooleanField(default=True, verbose_name='Посты разложены по лентам'),
+        ),
+        migrations.RunPython(mark_large_authors, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,18 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 
 User = get_user_model()
 
 
-class Post(models.Model):
+class AtomicSaveMixin:
+    """Сохраняет объект и обработчики post_save в одной транзакции."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class Post(AtomicSaveMixin, models.Model):
     text = models.TextField(verbose_name='Заголовок',
                             help_text='Напишите сюда что-нибудь'
                             )
@@ -30,11 +38,33 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='posts/thumbnails/',
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Число комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_pub_date_idx'
+                         ),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_pub_date_idx'
+                         ),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'
+                         ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
@@ -64,7 +94,7 @@ class Group(models.Model):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveMixin, models.Model):
     post = models.ForeignKey(Post,
                              on_delete=models.SET_NULL,
                              null=True,
@@ -88,9 +118,14 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'
+                         ),
+        ]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(User,
                              related_name='follower',
                              verbose_name='Подписчик',
@@ -110,3 +145,92 @@ class Follow(models.Model):
                                     name='unique_follow'
                                     )
         ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User,
+                             related_name='timeline',
+                             verbose_name='Читатель',
+                             on_delete=models.CASCADE,
+                             )
+    post = models.ForeignKey(Post,
+                             related_name='timeline_entries',
+                             verbose_name='Пост',
+                             on_delete=models.CASCADE,
+                             )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        indexes = [
+            models.Index(fields=['user', '-pub_date'],
+                         name='timeline_user_pub_date_idx'
+                         )
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'
+                                    )
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(User,
+                                primary_key=True,
+                                related_name='stats',
+                                verbose_name='Пользователь',
+                                on_delete=models.CASCADE,
+                                )
+    posts_count = models.PositiveIntegerField(verbose_name='Число постов',
+                                              default=0
+                                              )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Число подписок',
+        default=0
+    )
+    # Сбрасывается, когда подписчиков больше FOLLOW_FEED_FANOUT_LIMIT,
+    # и ставится обратно фоновым backfill_timelines
+    in_timelines = models.BooleanField(
+        verbose_name='Посты разложены по лентам',
+        default=True
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(Group,
+                                 primary_key=True,
+                                 related_name='stats',
+                                 verbose_name='Группа',
+                                 on_delete=models.CASCADE,
+                                 )
+    posts_count = models.PositiveIntegerField(verbose_name='Число постов',
+                                              default=0
+                                              )
+    last_post_at = models.DateTimeField(verbose_name='Последний пост',
+                                        blank=True,
+                                        null=True
+                                        )
+    recent_post_ids = models.CharField(
+        verbose_name='Последние посты',
+        help_text='id через запятую, новые первыми',
+        max_length=200,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Активность группы'
+        verbose_name_plural = 'Активность групп'
+
+    @property
+    def recent_ids(self):
+        return [int(pk) for pk in self.recent_post_ids.split(',') if pk]
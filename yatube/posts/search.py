@@ -0,0 +1,87 @@
+import re
+
+from django.db import connection
+
+from .feed import get_feed_queryset
+
+SQLITE_TABLE = 'posts_post_fts'
+POSTGRES_CONFIG = 'russian'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def get_words(query):
+    return WORD_RE.findall(query or '')[:20]
+
+
+def filter_posts(queryset, query):
+    """Оставляет посты, подходящие под запрос, лучшие совпадения первыми.
+
+    На SQLite поиск идёт по таблице FTS5, на PostgreSQL — по GIN-индексу
+    над to_tsvector, на других базах — простым icontains.
+    """
+    words = get_words(query)
+    if not words:
+        return queryset.none()
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{word}"' for word in words)
+        return queryset.extra(
+            tables=[SQLITE_TABLE],
+            where=[f'{SQLITE_TABLE}.rowid = posts_post.id',
+                   f'{SQLITE_TABLE} MATCH %s'],
+            params=[match],
+            select={'rank': f'bm25({SQLITE_TABLE})'},
+            order_by=['rank', '-pub_date'],
+        )
+    if connection.vendor == 'postgresql':
+        vector = f"to_tsvector('{POSTGRES_CONFIG}', posts_post.text)"
+        tsquery = f"plainto_tsquery('{POSTGRES_CONFIG}', %s)"
+        text = ' '.join(words)
+        return queryset.extra(
+            where=[f'{vector} @@ {tsquery}'],
+            params=[text],
+            select={'rank': f'ts_rank({vector}, {tsquery})'},
+            select_params=[text],
+            order_by=['-rank', '-pub_date'],
+        )
+    for word in words:
+        queryset = queryset.filter(text__icontains=word)
+    return queryset
+
+
+def search_posts(query):
+    return filter_posts(get_feed_queryset(), query)
+
+
+def index_post(post):
+    """Обновляет запись поста в поисковом индексе SQLite.
+
+    В PostgreSQL индекс построен над выражением и обновляется сам.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s',
+                       [post.pk])
+        cursor.execute(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text]
+        )
+
+
+def unindex_post(post):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s',
+                       [post.pk])
+
+
+def rebuild_index():
+    """Строит поисковый индекс SQLite заново по всем постам."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+        cursor.execute(f'INSERT INTO {SQLITE_TABLE} (rowid, text) '
+                       f'SELECT id, text FROM posts_post')
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.cache import bump_stamp
+
+from . import counters, feed, feed_cache, search
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created and settings.FOLLOW_FEED_FANOUT:
+        feed.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def drop_unfollowed(sender, instance, **kwargs):
+    if settings.FOLLOW_FEED_FANOUT:
+        feed.drop_from_timeline(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feed_cache(sender, **kwargs):
+    feed_cache.bump_feed_version()
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_card(sender, instance, created, **kwargs):
+    if not created:
+        feed_cache.bump_card_version('post', instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_cards(sender, instance, created, **kwargs):
+    if not created:
+        feed_cache.bump_card_version('group', instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, update_fields,
+                            **kwargs):
+    if created:
+        return
+    if update_fields and not CARD_USER_FIELDS & set(update_fields):
+        return
+    feed_cache.bump_card_version('user', instance.pk)
+    # Фрагмент главной хранит готовые карточки, поэтому его версия
+    # тоже сдвигается
+    feed_cache.bump_feed_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_cached_groups(sender, **kwargs):
+    bump_stamp(feed_cache.GROUPS_STAMP)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_users(sender, update_fields=None, **kwargs):
+    if update_fields and not CARD_USER_FIELDS & set(update_fields):
+        return
+    bump_stamp(feed_cache.USERS_STAMP)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._old_group_id = None
+    if instance.pk:
+        instance._old_group_id = (Post.objects.
+                                  filter(pk=instance.pk).
+                                  values_list('group_id', flat=True).
+                                  first()
+                                  )
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, **kwargs):
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id == instance.group_id and not created:
+        return
+    if old_group_id:
+        counters.change_group_stats(old_group_id, -1)
+    if instance.group_id:
+        counters.change_group_stats(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_group_post(sender, instance, **kwargs):
+    if instance.group_id:
+        counters.change_group_stats(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if instance.post_id:
+        counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change_author_stats(instance.user_id, following_count=1)
+        counters.change_author_stats(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_author_stats(instance.user_id, following_count=-1)
+    counters.change_author_stats(instance.author_id, followers_count=-1)
+
+
+# Регистрируется после count_new_follow: is_fanout_author должен
+# видеть число подписчиков уже с этой подпиской
+@receiver(post_save, sender=Follow)
+def backfill_new_follow(sender, instance, created, **kwargs):
+    if created and settings.FOLLOW_FEED_FANOUT:
+        feed.backfill_timeline(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance)
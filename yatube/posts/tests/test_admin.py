@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..admin import PostAdmin
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.group = Group.objects.create(
+            title='test group title',
+            slug='test_group_title',
+            description='test_group_description'
+        )
+        for i in range(PostAdmin.list_per_page + 5):
+            post = Post.objects.create(
+                text=f'Пост {i}',
+                author=User.objects.create_user(username=f'author_{i}'),
+                group=cls.group
+            )
+            Comment.objects.create(text=f'Комментарий {i}',
+                                   author=cls.admin,
+                                   post=post
+                                   )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists_page_by_cursor(self):
+        for name in ('admin:posts_post_changelist',
+                     'admin:posts_comment_changelist'):
+            with self.subTest(changelist=name):
+                response = self.client.get(reverse(name))
+                cl = response.context['cl']
+                self.assertTrue(cl.keyset)
+                self.assertEqual(len(cl.result_list), PostAdmin.list_per_page)
+
+                response = self.client.get(reverse(name) + cl.next_url())
+                next_cl = response.context['cl']
+                self.assertEqual(len(next_cl.result_list), 5)
+                self.assertFalse(
+                    set(cl.result_list) & set(next_cl.result_list)
+                )
+
+    def test_post_changelist_skips_exact_counts(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:posts_post_changelist'))
+        sql = '\n'.join(query['sql'] for query in queries)
+
+        self.assertNotIn('COUNT(', sql.upper())
+        self.assertNotIn('DISTINCT', sql.upper())
+        self.assertNotIn('FROM "posts_group"', sql)
+
+    def test_comment_changelist_does_not_scan_dates(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:posts_comment_changelist'))
+        sql = '\n'.join(query['sql'] for query in queries).upper()
+
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_sorted_changelist_falls_back_to_page_numbers(self):
+        response = self.client.get(reverse('admin:posts_post_changelist'),
+                                   {'o': '1'}
+                                   )
+        cl = response.context['cl']
+
+        self.assertFalse(cl.keyset)
+        self.assertEqual(cl.result_count, Post.objects.count())
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from yatube.settings import POSTS_PER_PAGE
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author',
+                                              first_name='Имя'
+                                              )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='test group title',
+            slug='test_group_title',
+            description='test_group_description'
+        )
+        for i in range(POSTS_PER_PAGE + 2):
+            Post.objects.create(text=f'Пост {i}',
+                                author=cls.author,
+                                group=cls.group
+                                )
+        cls.post = Post.objects.create(text='Последний пост',
+                                       author=cls.reader
+                                       )
+        Comment.objects.create(text='Комментарий',
+                               author=cls.reader,
+                               post=cls.post
+                               )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, name, client=None, params=None, **kwargs):
+        response = (client or self.client).get(
+            reverse(f'api:{name}', kwargs=kwargs), params or {}
+        )
+        return response.status_code, response.json()
+
+    def test_post_list_pages_by_cursor(self):
+        status, data = self.get('post_list')
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(len(data['results']), POSTS_PER_PAGE)
+        self.assertEqual(data['results'][0]['text'], 'Последний пост')
+        self.assertEqual(data['results'][0]['author'], 'reader')
+        self.assertIsNone(data['previous'])
+
+        second = self.client.get(data['next']).json()
+        self.assertEqual(len(second['results']), 3)
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            self.client.get(second['previous']).json()['results'],
+            data['results']
+        )
+
+    def test_fields_select_sparse_fieldset(self):
+        status, data = self.get('post_detail',
+                                params={'fields': 'text,comments_count'},
+                                post_id=self.post.id
+                                )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(data, {'text': 'Последний пост', 'comments_count': 1})
+
+        status, data = self.get('post_list', params={'fields': 'password'})
+        self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
+    def test_post_list_runs_one_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:post_list'))
+
+    def test_group_profile_and_comments(self):
+        _, data = self.get('group_posts', slug=self.group.slug)
+        self.assertEqual({post['group'] for post in data['results']},
+                         {self.group.slug}
+                         )
+        _, data = self.get('group_detail', slug=self.group.slug)
+        self.assertEqual(data['title'], self.group.title)
+
+        _, data = self.get('profile', username='author')
+        self.assertEqual(data['first_name'], 'Имя')
+        self.assertEqual(data['posts_count'], POSTS_PER_PAGE + 2)
+        self.assertEqual(data['followers_count'], 1)
+        _, data = self.get('profile_posts', username='reader')
+        self.assertEqual([post['id'] for post in data['results']],
+                         [self.post.id]
+                         )
+
+        _, data = self.get('post_comments', post_id=self.post.id)
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+
+        status, _ = self.get('profile', username='nobody')
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+
+    def test_follow_index_requires_login(self):
+        status, _ = self.get('follow_index')
+        self.assertEqual(status, HTTPStatus.UNAUTHORIZED)
+
+        client = Client()
+        client.force_login(self.reader)
+        status, data = self.get('follow_index', client=client)
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual({post['author'] for post in data['results']},
+                         {'author'}
+                         )
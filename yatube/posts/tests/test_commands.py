@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..bench import BENCH_VIEWS
+from ..models import AuthorStats, Comment, Follow, Group, Post
+from ..search import search_posts
+
+User = get_user_model()
+
+
+class ExplainFeedsCommandTests(TestCase):
+    def test_reports_plans_with_and_without_indexes(self):
+        out = StringIO()
+        err = StringIO()
+        call_command('explain_feeds', seed=30, comments=10, repeat=1,
+                     drop_indexes=True, stdout=out, stderr=err
+                     )
+        output = out.getvalue()
+
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertIn('без индексов', output)
+        self.assertIn('Индексы лент удаляются', err.getvalue())
+        self.assertIn('post_pub_date_id_idx', output)
+        self.assertIn('comment_post_created_idx', output)
+
+    def test_indexes_are_kept_without_flag(self):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('explain_feeds', seed=30, repeat=1, stdout=out)
+
+        self.assertFalse([query for query in queries
+                          if 'DROP INDEX' in query['sql']])
+        self.assertNotIn('без индексов', out.getvalue())
+        self.assertIn('с индексами', out.getvalue())
+
+
+class BenchCommandsTests(TestCase):
+    def test_seed_bench_creates_skewed_data(self):
+        call_command('seed_bench', users=20, groups=3, posts=200,
+                     comments=50, follows=100, stdout=StringIO()
+                     )
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 50)
+        top_author = AuthorStats.objects.order_by('-posts_count').first()
+        self.assertGreater(top_author.posts_count, 200 / 20)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('followers_count',
+                                                flat=True)),
+            Follow.objects.count()
+        )
+
+    def test_run_bench_reports_every_view(self):
+        call_command('seed_bench', users=10, groups=2, posts=30,
+                     comments=10, follows=20, stdout=StringIO()
+                     )
+        out = StringIO()
+        call_command('run_bench', requests=2, stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report['views']), set(BENCH_VIEWS))
+        for name, stats in report['views'].items():
+            with self.subTest(view=name):
+                self.assertEqual(stats['status'], 200)
+                self.assertGreater(stats['bytes'], 0)
+                self.assertGreater(stats['queries'], 0)
+                self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+                self.assertIn('card_hit_ratio', stats)
+
+
+class TransferCommandsTests(TestCase):
+    def test_export_and_import_round_trip(self):
+        call_command('seed_bench', users=10, groups=3, posts=40,
+                     comments=30, follows=20, stdout=StringIO()
+                     )
+        old_post = (Post.objects.exclude(comments_count=0).
+                    select_related('author').first())
+        old_comment = old_post.parent_post.earliest('created')
+        counts = {model: model.objects.count()
+                  for model in (Group, Post, Comment, Follow)}
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson')
+            call_command('export_posts', output=path, stderr=StringIO())
+            with open(path, encoding='utf-8') as dump:
+                records = [json.loads(line) for line in dump]
+            self.assertEqual(len(records), sum(counts.values()))
+
+            for model in (Comment, Follow, Post, Group):
+                model.objects.all().delete()
+            User.objects.all().delete()
+            out = StringIO()
+            call_command('import_posts', path, batch_size=7, stdout=out)
+
+        self.assertIn('строк/с', out.getvalue())
+        for model, count in counts.items():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.count(), count)
+        new_post = Post.objects.get(text=old_post.text)
+        self.assertEqual(new_post.pub_date, old_post.pub_date)
+        self.assertEqual(new_post.author.username, old_post.author.username)
+        self.assertEqual(new_post.comments_count, old_post.comments_count)
+        self.assertEqual(
+            new_post.parent_post.count(), old_post.comments_count
+        )
+        self.assertIn(new_post, search_posts(old_post.text))
+        self.assertEqual(new_post.parent_post.earliest('created').created,
+                         old_comment.created)
+
+    def import_records(self, records):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.ndjson')
+            with open(path, 'w', encoding='utf-8') as dump:
+                for record in records:
+                    dump.write(json.dumps(record) + '\n')
+            out, err = StringIO(), StringIO()
+            call_command('import_posts', path, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_comments_without_post_are_counted(self):
+        post = {'model': 'post', 'id': 1, 'text': 'Пост',
+                'pub_date': '2020-01-02T03:04:05+00:00', 'author': 'author',
+                'group': None, 'image': ''}
+        comments = [{'model': 'comment', 'id': i, 'post': post_id,
+                     'author': 'reader', 'text': f'Комментарий {i}',
+                     'created': '2020-01-03T00:00:00+00:00'}
+                    for i, post_id in enumerate((1, 2, 2))]
+
+        out, err = self.import_records([post, *comments])
+
+        self.assertIn('Загружено строк: 2 ', out)
+        self.assertIn('Пропущено комментариев к постам не из файла: 2', err)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.created.isoformat(),
+                         '2020-01-03T00:00:00+00:00')
+        self.assertEqual(Post.objects.get().pub_date.isoformat(),
+                         '2020-01-02T03:04:05+00:00')
+
+    def test_import_into_database_with_posts_is_refused(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=author)
+
+        with self.assertRaises(CommandError):
+            self.import_records([])
+        self.assertEqual(Post.objects.count(), 1)
@@ -0,0 +1,151 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='author')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counter_follows_writes(self):
+        post = Post.objects.create(text='test', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comment_counter_follows_writes(self):
+        post = Post.objects.create(text='test', author=self.author)
+        comment = Comment.objects.create(text='test', author=self.user,
+                                         post=post
+                                         )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters_follow_writes(self):
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_deleting_user_does_not_break_counters(self):
+        author = User.objects.create_user(username='deleted_author')
+        Post.objects.create(text='test', author=author)
+        Follow.objects.create(user=self.user, author=author)
+        author_id = author.pk
+        author.delete()
+
+        self.assertFalse(AuthorStats.objects.filter(user_id=author_id))
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        post = Post.objects.create(text='test', author=self.author)
+        Comment.objects.create(text='test', author=self.user, post=post)
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+        AuthorStats.objects.filter(user=self.user).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+
+        call_command('recount_counters', stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        self.assertEqual(post.comments_count, 1)
+
+    def test_profile_and_detail_pages_run_no_count_queries(self):
+        post = Post.objects.create(text='test', author=self.author)
+        urls = (
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}
+                    ),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.context['posts_counter'], 1)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(', query['sql'].upper())
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='')
+        cls.other_group = Group.objects.create(title='Другая группа',
+                                               slug='other',
+                                               description='')
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_group_stats_follow_writes(self):
+        posts = [Post.objects.create(text=f'Пост {i}',
+                                     author=self.author,
+                                     group=self.group)
+                 for i in range(5)]
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 5)
+        self.assertEqual(stats.last_post_at, posts[-1].pub_date)
+        self.assertEqual(stats.recent_ids, [post.pk for post in posts[:1:-1]])
+
+        posts[-1].group = self.other_group
+        posts[-1].save()
+        self.assertEqual(self.stats(self.group).posts_count, 4)
+        self.assertEqual(self.stats(self.other_group).recent_ids,
+                         [posts[-1].pk]
+                         )
+
+        posts[-2].delete()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 3)
+        self.assertEqual(stats.recent_ids, [post.pk for post in posts[2::-1]])
+
+    def test_recount_repairs_group_stats(self):
+        Post.objects.create(text='Пост', author=self.author, group=self.group)
+        GroupStats.objects.all().delete()
+
+        call_command('recount_counters', stdout=StringIO())
+
+        self.assertEqual(self.stats(self.group).posts_count, 1)
+        self.assertEqual(self.stats(self.other_group).posts_count, 0)
+
+    def test_group_index_runs_no_group_by(self):
+        for i in range(3):
+            Post.objects.create(text=f'Пост {i}',
+                                author=self.author,
+                                group=self.group)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:group_index'))
+
+        groups = list(response.context['page_obj'])
+        self.assertEqual(groups, [self.group, self.other_group])
+        self.assertEqual(groups[0].activity.posts_count, 3)
+        self.assertEqual(len(groups[0].recent_posts), 3)
+        self.assertContains(response, 'Пост 2')
+        for query in queries.captured_queries:
+            self.assertNotIn('GROUP BY', query['sql'].upper())
@@ -84,6 +84,37 @@ class PostCreateFormTests(TestCase):
                                             ).exists()
                         )
 
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_create_post_builds_thumbnail(self):
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'post_text', 'image': uploaded},
+        )
+
+        created_post = Post.objects.all().order_by('-id')[0]
+        self.assertTrue(created_post.thumbnail.name.endswith('_thumb.jpg'))
+        self.assertEqual(
+            (created_post.thumbnail.width, created_post.thumbnail.height),
+            (678, 339)
+        )
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': created_post.id})
+        )
+        self.assertContains(response, created_post.thumbnail.url)
+
     def test_title_label(self):
         self.form = PostForm()
         title_labels = {
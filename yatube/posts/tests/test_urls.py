@@ -1,9 +1,10 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.test import Client, TestCase
 
+from core.cache import clear_caches
+
 from ..models import Group, Post
 
 User = get_user_model()
@@ -18,7 +19,7 @@ class SmokeTest(TestCase):
 class PostsURLTests(TestCase):
 
     def setUp(self):
-        cache.clear()
+        clear_caches()
 
     @classmethod
     def setUpClass(cls):
@@ -52,6 +53,7 @@ class PostsURLTests(TestCase):
                     f'/group/{self.slug}/',
                     f'/profile/{self.username}/',
                     f'/posts/{self.post_id}/',
+                    '/search/?q=test',
                     ]
         for url in url_list:
             with self.subTest():
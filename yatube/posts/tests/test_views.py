@@ -1,18 +1,30 @@
 import shutil
 import tempfile
+from io import StringIO
+from http import HTTPStatus
 from math import ceil
+from unittest import mock
+from urllib.parse import urlencode
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from yatube.settings import POSTS_PER_PAGE
+from core.cache import clear_caches
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 
-from ..models import Post, Group, Comment, Follow
+from .. import feed_cache
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry)
+from ..utils import estimate_count, get_page_obj
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -22,7 +34,7 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 class PostsPageTests(TestCase):
 
     def setUp(self):
-        cache.clear()
+        clear_caches()
 
     @classmethod
     def setUpClass(cls):
@@ -364,7 +376,7 @@ class PaginatorViewsTest(TestCase):
             int(Post.objects.all().count() % POSTS_PER_PAGE))
 
     def test_index_first_page_contains_correct_number_of_records(self):
-        cache.clear()
+        clear_caches()
         response = self.client.get(reverse('posts:index'))
         number_of_posts = len(response.context['page_obj'])
         self.assertEqual(number_of_posts, POSTS_PER_PAGE)
@@ -427,6 +439,119 @@ class PaginatorViewsTest(TestCase):
                          )
 
 
+class PageWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        for i in range(40):
+            Post.objects.create(text=f'test post {i}', author=author)
+
+    def setUp(self):
+        clear_caches()
+
+    def render_page(self, number):
+        request = RequestFactory().get('/', {'page': number})
+        page_obj = get_page_obj(request, Post.objects.all(), 1)
+        html = render_to_string('includes/paginator.html',
+                                {'page_obj': page_obj}
+                                )
+        return page_obj, html
+
+    def test_window_size_does_not_depend_on_page_count(self):
+        page_obj, html = self.render_page(20)
+
+        self.assertEqual(page_obj.page_window,
+                         [1, None, 18, 19, 20, 21, 22, None, 40]
+                         )
+        self.assertEqual(html.count('class="page-item'), 13)
+        self.assertIn('page=40', html)
+        self.assertNotIn('page=30', html)
+
+    def test_window_near_edges(self):
+        self.assertEqual(self.render_page(1)[0].page_window,
+                         [1, 2, 3, None, 40]
+                         )
+        self.assertEqual(self.render_page(40)[0].page_window,
+                         [1, None, 38, 39, 40]
+                         )
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        for i in range(25):
+            Post.objects.create(text=f'test post {i}', author=author)
+
+    def setUp(self):
+        clear_caches()
+
+    def get_page(self, number, count):
+        request = RequestFactory().get('/', {'page': number})
+        return get_page_obj(request, Post.objects.all(), 10, count)
+
+    def test_index_count_is_estimated_and_cached(self):
+        self.client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 25)
+
+    def test_cached_index_keeps_navigation(self):
+        url = reverse('posts:index')
+        first = self.client.get(url, {'page': 2}).content.decode()
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, {'page': 2}).content.decode()
+
+        self.assertEqual(cached, first)
+        self.assertIn('?page=3', cached)
+        self.assertIn('?page=1', cached)
+
+    def test_overestimated_count_clamps_to_last_page(self):
+        page_obj = self.get_page(9, 90)
+
+        self.assertEqual(page_obj.number, 3)
+        self.assertEqual(len(page_obj), 5)
+        self.assertEqual(page_obj.paginator.num_pages, 3)
+        self.assertFalse(page_obj.has_next())
+
+    def test_underestimated_count_adds_next_page(self):
+        page_obj = self.get_page(1, 5)
+
+        self.assertEqual(len(page_obj), 10)
+        self.assertTrue(page_obj.has_next())
+        page_obj = self.get_page(3, 5)
+        self.assertEqual(page_obj.number, 3)
+        self.assertEqual(page_obj.paginator.count, 25)
+
+    def test_recount_counters_refreshes_estimate(self):
+        self.assertEqual(estimate_count(Post.objects.all()), 25)
+        Post.objects.filter(pk__gt=Post.objects.order_by('pk')[4].pk).delete()
+        self.assertEqual(estimate_count(Post.objects.all()), 25)
+
+        call_command('recount_counters', stdout=StringIO())
+
+        self.assertEqual(estimate_count(Post.objects.all()), 5)
+
+    def test_filtered_count_is_exact_on_postgresql(self):
+        ids = Post.objects.order_by('pk').values_list('pk', flat=True)[:3]
+        queryset = Post.objects.filter(pk__in=list(ids))
+
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(estimate_count(queryset), 3)
+
+        self.assertNotIn('EXPLAIN', queries[0]['sql'])
+
+    def test_filtered_count_is_cached(self):
+        queryset = Post.objects.filter(text__startswith='test post 1')
+        self.assertEqual(estimate_count(queryset), 11)
+        Post.objects.filter(text='test post 1').delete()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(estimate_count(queryset), 11)
+        self.assertEqual(estimate_count(Post.objects.none()), 0)
+
+
 class PageCachingTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -438,19 +563,596 @@ class PageCachingTests(TestCase):
             author=cls.author
         )
 
-    def test_index_page_is_caching(self):
-        posts_count = Post.objects.all().count()
+    def setUp(self):
+        clear_caches()
+
+    def test_index_post_list_is_caching(self):
+        feed_cache.stats.clear()
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        self.assertEqual(feed_cache.stats['misses'], 1)
+        self.assertEqual(feed_cache.stats['hits'], 1)
+
+    def test_index_cache_is_invalidated_by_post_changes(self):
         content_before_delete = self.client.get(reverse('posts:index')).content
-        Post.objects.get(id=1).delete()
+        Post.objects.get(id=self.post.id).delete()
         content_after_delete = self.client.get(reverse('posts:index')).content
 
-        self.assertEqual(Post.objects.count(), posts_count - 1)
-        self.assertEqual(content_before_delete, content_after_delete)
+        self.assertNotEqual(content_before_delete, content_after_delete)
+
+        Post.objects.create(text='new post text', author=self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'new post text')
+
+    def test_index_cache_does_not_leak_user_chrome(self):
+        self.client.get(reverse('posts:index'))
+        authorized_client = Client()
+        authorized_client.force_login(self.author)
+        response = authorized_client.get(reverse('posts:index'))
+
+        self.assertContains(response, reverse('users:logout'))
+
+
+class PostCardCachingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author',
+                                              first_name='Лев',
+                                              last_name='Толстой'
+                                              )
+        cls.group = Group.objects.create(
+            title='test group title',
+            slug='test_group_title',
+            description='test_group_description'
+        )
+        cls.post = Post.objects.create(text='text',
+                                       author=cls.author,
+                                       group=cls.group
+                                       )
+
+    def setUp(self):
+        clear_caches()
+        feed_cache.stats.clear()
+        self.url = reverse('posts:group_list',
+                           kwargs={'slug': self.group.slug}
+                           )
+
+    def test_feed_pages_reuse_cached_cards(self):
+        self.client.get(self.url)
+        self.client.get(reverse('posts:profile',
+                                kwargs={'username': self.author.username}
+                                ))
+
+        self.assertEqual(feed_cache.stats['card_misses'], 1)
+        self.assertEqual(feed_cache.stats['card_hits'], 1)
+
+    def test_card_is_rerendered_after_changes(self):
+        self.client.get(self.url)
+        changes = (
+            ('post', Post.objects.get(pk=self.post.pk), 'text', 'new text'),
+            ('author', User.objects.get(pk=self.author.pk),
+             'first_name', 'Фёдор'),
+            ('group', Group.objects.get(pk=self.group.pk),
+             'title', 'new group title'),
+        )
+        for name, obj, field, value in changes:
+            with self.subTest(change=name):
+                setattr(obj, field, value)
+                obj.save()
+                self.assertContains(self.client.get(self.url), value)
+
+    def test_group_delete_reaches_cached_index(self):
+        index = reverse('posts:index')
+        self.assertContains(self.client.get(index), self.group.slug)
+        Group.objects.filter(pk=self.group.pk).delete()
+
+        self.assertNotContains(self.client.get(index), self.group.slug)
 
-        cache.clear()
-        content_after_cache_is_cleared = self.client.get(
-            reverse('posts:index')
-        ).content
-        self.assertNotEqual(content_after_delete,
-                            content_after_cache_is_cleared
+    def test_author_rename_reaches_cached_index(self):
+        index = reverse('posts:index')
+        self.assertContains(self.client.get(index), 'Толстой')
+        author = User.objects.get(pk=self.author.pk)
+        author.last_name = 'Достоевский'
+        author.save()
+
+        self.assertContains(self.client.get(index), 'Достоевский')
+
+    def test_login_keeps_cards(self):
+        self.client.get(self.url)
+        self.client.force_login(self.author)
+        self.client.get(self.url)
+
+        self.assertEqual(feed_cache.stats['card_hits'], 1)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='test group title',
+            slug='test_group_title',
+            description='test_group_description'
+        )
+        cls.post = Post.objects.create(
+            text='text',
+            author=cls.author,
+            group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': cls.author.username}
+                    ),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        )
+
+    def setUp(self):
+        clear_caches()
+
+    def test_unchanged_pages_return_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED
+                                 )
+                self.assertEqual(response.templates, [])
+
+    def test_changes_update_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(text='comment',
+                               author=self.author,
+                               post=self.post
+                               )
+        Post.objects.create(text='new post',
+                            author=self.author,
+                            group=self.group
                             )
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_author_rename_updates_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое имя'
+        author.save(update_fields=['first_name'])
+
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_author_etag_includes_card_version(self):
+        request = RequestFactory().get('/')
+        request.user = self.author
+        etag = feed_cache.post_detail_etag(request, self.post.pk)
+        feed_cache.bump_card_version('user', self.author.pk)
+
+        self.assertNotEqual(feed_cache.post_detail_etag(request, self.post.pk),
+                            etag)
+
+    def test_etag_depends_on_user(self):
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        authorized_client = Client()
+        authorized_client.force_login(self.author)
+        response = authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test_user')
+        cls.test_group = Group.objects.create(
+            title='test group title',
+            slug='test_group_title',
+            description='test_group_description'
+        )
+        for i in range(0, 13):
+            Post.objects.create(
+                text=f'test post {i}',
+                author=cls.user,
+                group=cls.test_group
+            )
+
+    def setUp(self):
+        clear_caches()
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        url = reverse('posts:group_list',
+                      kwargs={'slug': self.test_group.slug}
+                      )
+        first_page = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first_page), POSTS_PER_PAGE)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+
+        last_page = self.client.get(
+            url + f'?after={first_page.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(len(last_page), 13 - POSTS_PER_PAGE)
+        self.assertTrue(last_page.has_previous())
+        self.assertFalse(last_page.has_next())
+
+        back_page = self.client.get(
+            url + f'?before={last_page.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_cursor_page_runs_no_count_query(self):
+        url = reverse('posts:group_list',
+                      kwargs={'slug': self.test_group.slug}
+                      )
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('posts:index') + '?after=@@@')
+        self.assertEqual(len(response.context['page_obj']), POSTS_PER_PAGE)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+@override_settings(FOLLOW_FEED_FANOUT=True)
+class FollowFeedFanoutTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test_user')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.author = User.objects.create_user(username='author')
+
+    def follow_feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_is_pushed_to_follower_timeline(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='fanout', author=self.author)
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(self.follow_feed(), [post])
+
+    def test_follow_backfills_and_unfollow_drops_timeline(self):
+        post = Post.objects.create(text='backfill', author=self.author)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.follow_feed(), [post])
+
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.follow_feed(), [])
+
+    @override_settings(FOLLOW_FEED_MAX_LENGTH=2)
+    def test_timeline_is_bounded(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [Post.objects.create(text=f'bounded {i}', author=self.author)
+                 for i in range(3)]
+        self.assertEqual(len(self.follow_feed()), 2)
+
+        call_command('backfill_timelines', '--trim-only', stdout=StringIO())
+
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.user).
+                values_list('post', flat=True)),
+            {posts[1].pk, posts[2].pk},
+        )
+
+    def test_author_back_under_limit_is_backfilled(self):
+        other = User.objects.create_user(username='other_follower')
+        with override_settings(FOLLOW_FEED_FANOUT_LIMIT=1):
+            Follow.objects.create(user=self.user, author=self.author)
+            Follow.objects.create(user=other, author=self.author)
+            post = Post.objects.create(text='while large',
+                                       author=self.author)
+            self.assertFalse(TimelineEntry.objects.exists())
+
+            Follow.objects.filter(user=other).delete()
+
+            self.assertFalse(TimelineEntry.objects.exists())
+            self.assertEqual(self.follow_feed(), [post])
+
+            call_command('backfill_timelines', '--pending',
+                         stdout=StringIO())
+
+            self.assertTrue(
+                AuthorStats.objects.get(user=self.author).in_timelines
+            )
+            self.assertEqual(
+                list(TimelineEntry.objects.values_list('user', 'post')),
+                [(self.user.pk, post.pk)],
+            )
+            self.assertEqual(self.follow_feed(), [post])
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=1)
+    def test_follow_over_the_limit_is_not_backfilled(self):
+        other = User.objects.create_user(username='other_follower')
+        Follow.objects.create(user=other, author=self.author)
+        Post.objects.create(text='before', author=self.author)
+
+        Follow.objects.create(user=self.user, author=self.author)
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=1)
+    def test_crossing_the_limit_is_recorded_by_the_counter_update(self):
+        readers = [User.objects.create_user(username=f'reader_{i}')
+                   for i in range(3)]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.followers_count, 3)
+        self.assertFalse(stats.in_timelines)
+
+        Follow.objects.filter(user__in=readers[1:]).delete()
+
+        stats.refresh_from_db()
+        self.assertEqual(stats.followers_count, 1)
+        self.assertFalse(stats.in_timelines)
+
+    @override_settings(FOLLOW_FEED_FANOUT=False)
+    def test_backfill_command_fills_existing_follows(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='before fanout', author=self.author)
+
+        with override_settings(FOLLOW_FEED_FANOUT=True):
+            self.assertEqual(self.follow_feed(), [])
+            call_command('backfill_timelines', stdout=StringIO())
+            self.assertEqual(self.follow_feed(), [post])
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=0)
+    def test_large_author_falls_back_to_fanout_on_read(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='large author', author=self.author)
+
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.follow_feed(), [post])
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test_user')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='test group title',
+            slug='test_group_title',
+            description='test_group_description'
+        )
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(POSTS_PER_PAGE):
+            Post.objects.create(
+                text=f'test post {i}',
+                author=User.objects.create_user(username=f'author_{i}'),
+                group=cls.group
+            )
+            Post.objects.create(
+                text=f'author post {i}',
+                author=cls.author,
+                group=Group.objects.create(title=f'group {i}',
+                                           slug=f'group_{i}',
+                                           description='description'
+                                           )
+            )
+
+    def setUp(self):
+        clear_caches()
+
+    def test_feed_pages_run_fixed_number_of_queries(self):
+        pages_queries = {
+            reverse('posts:index'): 3,
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}
+                    ): 2,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}
+                    ): 4,
+        }
+        for url, expected in pages_queries.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(expected):
+                    self.client.get(url)
+
+    def test_cached_group_is_invalidated_on_change(self):
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.context['group'].title, 'Новое название')
+
+    def test_group_and_author_are_cached_in_process(self):
+        urls = {
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}
+                    ): 1,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}
+                    ): 3,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(expected):
+                    self.client.get(url)
+
+    def test_missing_group_and_author_do_not_write_cache(self):
+        urls = (reverse('posts:group_list', kwargs={'slug': 'missing'}),
+                reverse('posts:profile', kwargs={'username': 'missing'}))
+        for url in urls:
+            self.client.get(url)
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add, \
+                mock.patch.object(cache, 'set', wraps=cache.set) as set_:
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code,
+                                     HTTPStatus.NOT_FOUND)
+
+        self.assertFalse(add.called)
+        self.assertFalse(set_.called)
+
+    def test_follow_index_runs_fixed_number_of_queries(self):
+        with self.assertNumQueries(4):
+            self.authorized_client.get(reverse('posts:follow_index'))
+
+    def test_follow_index_count_comes_from_author_counters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(
+                reverse('posts:follow_index')
+            )
+        sql = '\n'.join(query['sql'] for query in queries).upper()
+
+        self.assertNotIn('COUNT(', sql)
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         POSTS_PER_PAGE)
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(text='test post', author=cls.user)
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for i in range(start, start + count):
+            Comment.objects.create(
+                text=f'comment {i}',
+                author=User.objects.create_user(username=f'commenter_{i}'),
+                post=self.post
+            )
+
+    def test_post_detail_runs_fixed_number_of_queries(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.add_comments(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.add_comments(COMMENTS_PER_PAGE * 2)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(url)
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(len(response.context['comments']),
+                         COMMENTS_PER_PAGE
+                         )
+
+    def test_comment_posted_to_detail_is_shown(self):
+        client = Client()
+        client.force_login(self.user)
+        self.add_comments(2)
+
+        response = client.post(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            {'text': 'свежий комментарий'},
+        )
+
+        self.assertEqual(response.context['comments'][0].text,
+                         'свежий комментарий')
+        self.assertEqual(len(response.context['comments']), 3)
+
+    def test_comments_fragment_returns_next_batch(self):
+        self.add_comments(COMMENTS_PER_PAGE + 3)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        first = response.context['comments']
+        self.assertTrue(first.has_next())
+
+        response = self.client.get(
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+            {'after': first.next_cursor}
+        )
+        second = response.context['comments']
+
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            set(first) | set(second),
+            set(Comment.objects.filter(post=self.post))
+        )
+        self.assertEqual(second[-1].text, 'comment 0')
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create_user(username='test_user')
+        cls.weak_match = Post.objects.create(
+            text='Котики и собаки, много собак, собаки везде',
+            author=cls.user
+        )
+        cls.strong_match = Post.objects.create(
+            text='Котики! Котики котики',
+            author=cls.user
+        )
+        Post.objects.create(text='Про погоду', author=cls.user)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': query, **params}
+                                   )
+        return list(response.context['page_obj'])
+
+    def test_search_ranks_results(self):
+        self.assertEqual(self.search('котики'),
+                         [self.strong_match, self.weak_match]
+                         )
+
+    def test_search_index_follows_post_changes(self):
+        post = Post.objects.create(text='Новое слово: жираф', author=self.user)
+        self.assertEqual(self.search('жираф'), [post])
+
+        post.text = 'Переписанный пост'
+        post.save()
+        self.assertEqual(self.search('жираф'), [])
+        self.assertEqual(self.search('переписанный'), [post])
+
+        post.delete()
+        self.assertEqual(self.search('переписанный'), [])
+
+    def test_search_tolerates_query_syntax(self):
+        self.assertEqual(self.search('"котики" AND OR *'), [])
+        self.assertEqual(self.search(''), [])
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True)
+    def test_search_pages_keep_query(self):
+        for i in range(POSTS_PER_PAGE):
+            Post.objects.create(text=f'котики {i}', author=self.user)
+        response = self.client.get(reverse('posts:search'), {'q': 'котики'})
+
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         POSTS_PER_PAGE + 2
+                         )
+        query = urlencode({'q': 'котики'})
+        self.assertContains(response, f'?{query}&amp;page=2')
@@ -0,0 +1,82 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from . import feed_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def resize(image_file):
+    """Вписывает картинку в THUMBNAIL_SIZE с увеличением и отдаёт JPEG."""
+    width, height = settings.THUMBNAIL_SIZE
+    with Image.open(image_file) as image:
+        image = image.convert('RGB')
+        ratio = min(width / image.width, height / image.height)
+        size = (max(round(image.width * ratio), 1),
+                max(round(image.height * ratio), 1))
+        buffer = BytesIO()
+        image.resize(size, Image.LANCZOS).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def make_thumbnail(post_id):
+    """Строит миниатюру поста и сохраняет её в Post.thumbnail."""
+    post = Post.objects.only('image', 'thumbnail').filter(pk=post_id).first()
+    if post is None:
+        return
+    old_thumbnail = post.thumbnail.name
+    if post.image:
+        name = os.path.splitext(os.path.basename(post.image.name))[0]
+        post.thumbnail.save(f'{post_id}_{name}.jpg',
+                            ContentFile(resize(post.image)),
+                            save=False
+                            )
+    else:
+        post.thumbnail = ''
+    Post.objects.filter(pk=post_id).update(thumbnail=post.thumbnail.name)
+    if old_thumbnail and old_thumbnail != post.thumbnail.name:
+        post.thumbnail.storage.delete(old_thumbnail)
+    feed_cache.bump_card_version('post', post_id)
+    feed_cache.bump_feed_version()
+
+
+def run_in_worker(post_id):
+    try:
+        make_thumbnail(post_id)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnail(post):
+    """Ставит построение миниатюры в очередь после коммита транзакции.
+
+    При THUMBNAIL_ASYNC = False миниатюра строится сразу.
+    """
+    if not settings.THUMBNAIL_ASYNC:
+        make_thumbnail(post.pk)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(run_in_worker, post.pk)
+    )
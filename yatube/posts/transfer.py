@@ -0,0 +1,225 @@
+import json
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import feed, feed_cache
+from .counters import (recount_author_stats, recount_comments,
+                       recount_group_stats)
+from .models import Comment, Follow, Group, Post
+from .search import rebuild_index
+
+User = get_user_model()
+
+# Что выгружается для каждой модели: поле записи и путь в ORM.
+# Пользователи и группы передаются естественными ключами.
+EXPORT_FIELDS = {
+    'group': (Group, {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }),
+    'post': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    }),
+    'comment': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follow': (Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+
+
+def encode_value(value):
+    """Даты выгружаются целиком, с микросекундами."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+def export_rows(stream, chunk_size=2000):
+    """Пишет группы, посты, комментарии и подписки в NDJSON.
+
+    Строки читаются через values().iterator(), поэтому в памяти
+    держится не больше одной пачки. Возвращает число строк.
+    """
+    rows = 0
+    for name, (model, fields) in EXPORT_FIELDS.items():
+        queryset = model.objects.order_by('pk').values_list(*fields.values())
+        for values in queryset.iterator(chunk_size=chunk_size):
+            record = {'model': name, **dict(zip(fields, values))}
+            stream.write(json.dumps(record, default=encode_value,
+                                    ensure_ascii=False) + '\n')
+            rows += 1
+    return rows
+
+
+def created_ids(model, objects):
+    """Возвращает id только что созданных bulk_create объектов.
+
+    PostgreSQL отдаёт их сам, на SQLite берутся последние id таблицы:
+    внутри транзакции запись в базу никто другой не ведёт.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return [obj.pk for obj in objects]
+    ids = model.objects.order_by('-pk').values_list('pk', flat=True)
+    return sorted(ids[:len(objects)])
+
+
+def create_with_dates(model, objects, date_field):
+    """bulk_create, после которого даты из файла пишутся отдельно.
+
+    auto_now_add подставляет текущее время при любой вставке, поэтому
+    даты возвращаются одним bulk_update по id созданных строк.
+    Возвращает эти id.
+    """
+    dates = [getattr(obj, date_field) for obj in objects]
+    model.objects.bulk_create(objects)
+    ids = created_ids(model, objects)
+    for obj, pk, date in zip(objects, ids, dates):
+        obj.pk = pk
+        setattr(obj, date_field, date)
+    model.objects.bulk_update(objects, [date_field])
+    return ids
+
+
+class Importer:
+    """Загружает NDJSON пачками bulk_create, каждую в своей транзакции.
+
+    Пользователи ищутся по username и создаются, если их нет, группы —
+    по slug. Старые id постов сопоставляются новым, чтобы привязать
+    к ним комментарии; комментарии к постам, которых нет в файле,
+    пропускаются и считаются в `skipped`. Посты и комментарии не
+    сверяются с уже лежащими в базе, поэтому загружать данные нужно
+    в пустую базу: повторный импорт создаст дубликаты.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.pending = {name: [] for name in EXPORT_FIELDS}
+        self.post_ids = {}
+        self.rows = 0
+        self.skipped = 0
+
+    def add(self, record):
+        name = record.pop('model')
+        if name not in self.pending:
+            raise ValueError(f'Неизвестная модель: {name}')
+        self.pending[name].append(record)
+        if len(self.pending[name]) >= self.batch_size:
+            self.flush(name)
+
+    def flush(self, name=None):
+        """Сохраняет накопленные записи вместе с тем, от чего они зависят."""
+        for current in EXPORT_FIELDS:
+            records = self.pending[current]
+            if records:
+                self.pending[current] = []
+                with transaction.atomic():
+                    getattr(self, f'create_{current}s')(records)
+                self.rows += len(records)
+            if current == name:
+                break
+
+    def get_user_ids(self, usernames):
+        usernames = set(usernames)
+        user_ids = dict(User.objects.filter(username__in=usernames).
+                        values_list('username', 'pk'))
+        missing = usernames - set(user_ids)
+        if missing:
+            users = [User(username=username) for username in missing]
+            for user in users:
+                user.set_unusable_password()
+            User.objects.bulk_create(users)
+            user_ids.update(User.objects.filter(username__in=missing).
+                            values_list('username', 'pk'))
+        return user_ids
+
+    def create_groups(self, records):
+        existing = set(Group.objects.filter(
+            slug__in=[record['slug'] for record in records]
+        ).values_list('slug', flat=True))
+        Group.objects.bulk_create(
+            [Group(**record) for record in records
+             if record['slug'] not in existing]
+        )
+
+    def create_posts(self, records):
+        user_ids = self.get_user_ids(record['author'] for record in records)
+        group_ids = dict(Group.objects.filter(
+            slug__in={record['group'] for record in records}
+        ).values_list('slug', 'pk'))
+        posts = [Post(text=record['text'],
+                      pub_date=parse_datetime(record['pub_date']),
+                      author_id=user_ids[record['author']],
+                      group_id=group_ids.get(record['group']),
+                      image=record.get('image') or '')
+                 for record in records]
+        self.post_ids.update(zip((record['id'] for record in records),
+                                 create_with_dates(Post, posts, 'pub_date')))
+
+    def create_comments(self, records):
+        known = [record for record in records
+                 if record['post'] in self.post_ids]
+        self.skipped += len(records) - len(known)
+        if not known:
+            return
+        user_ids = self.get_user_ids(record['author'] for record in known)
+        comments = [Comment(text=record['text'],
+                            created=parse_datetime(record['created']),
+                            author_id=user_ids[record['author']],
+                            post_id=self.post_ids[record['post']])
+                    for record in known]
+        create_with_dates(Comment, comments, 'created')
+
+    def create_follows(self, records):
+        user_ids = self.get_user_ids(
+            [record['user'] for record in records]
+            + [record['author'] for record in records]
+        )
+        follows = [Follow(user_id=user_ids[record['user']],
+                          author_id=user_ids[record['author']])
+                   for record in records
+                   if record['user'] != record['author']]
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        if settings.FOLLOW_FEED_FANOUT:
+            for follow in follows:
+                feed.backfill_timeline(follow)
+
+
+def import_rows(stream, batch_size=1000):
+    """Загружает NDJSON из потока в пустую базу.
+
+    Возвращает (загружено строк, пропущено комментариев, секунд).
+
+    bulk_create обходит сигналы, поэтому в конце пересчитываются
+    счётчики и поисковый индекс, а кэш лент сбрасывается.
+    """
+    started = time.perf_counter()
+    importer = Importer(batch_size)
+    for line in stream:
+        if line.strip():
+            importer.add(json.loads(line))
+    importer.flush()
+    recount_author_stats()
+    recount_comments()
+    recount_group_stats()
+    rebuild_index()
+    feed_cache.bump_feed_version()
+    return (importer.rows - importer.skipped, importer.skipped,
+            time.perf_counter() - started)
@@ -6,6 +6,10 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('groups/',
+         views.group_index,
+         name='group_index'
+         ),
     path('group/<slug:slug>/',
          views.group_posts,
          name='group_list'
@@ -18,6 +22,14 @@ urlpatterns = [
          views.post_detail,
          name='post_detail'
          ),
+    path('posts/<int:post_id>/comments/',
+         views.comment_list,
+         name='comments'
+         ),
+    path('search/',
+         views.search,
+         name='search'
+         ),
     path('create/',
          views.post_create,
          name='post_create'
@@ -1,9 +1,295 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
+import json
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-def get_page_obj(request, post_list, number):
-    """Возвращает готовый паджинатор для постов."""
-    paginator = Paginator(post_list, number)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+from core.cache import get_or_compute
+
+TABLE_COUNT_KEY = 'rows:{table}'
+QUERY_COUNT_KEY = 'rows:query:{digest}'
+
+
+def encode_cursor(obj, field='pub_date'):
+    """Упаковывает (дата, id) объекта или строки values() в токен."""
+    if isinstance(obj, dict):
+        value, pk = obj[field], obj['id']
+    else:
+        value, pk = getattr(obj, field), obj.pk
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора, для битого токена возвращает None."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().rsplit('|', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Страница выбирается токенами `after`/`before`, а не номером,
+    от новых объектов к старым по полю даты `field`.
+    `number` и `num_pages` подбираются так, чтобы `has_next` и
+    `has_previous` у обычного `Page` отвечали без запроса к базе.
+    """
+    cursor = True
+
+    def __init__(self, object_list, per_page, after=None, before=None,
+                 field='pub_date'):
+        super().__init__(object_list.order_by(f'-{field}', '-pk'), per_page)
+        self.field = field
+        self.after = decode_cursor(after)
+        self.before = None if self.after else decode_cursor(before)
+
+    def get_page(self, number=None):
+        queryset = self.object_list
+        field = self.field
+        if self.before:
+            value, pk = self.before
+            queryset = queryset.filter(
+                Q(**{f'{field}__gt': value})
+                | Q(**{field: value, 'pk__gt': pk})
+            ).order_by(field, 'pk')
+        elif self.after:
+            value, pk = self.after
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value})
+                | Q(**{field: value, 'pk__lt': pk})
+            )
+        posts = list(queryset[:self.per_page + 1])
+        has_more = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        if self.before:
+            posts.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = bool(self.after), has_more
+        has_previous = has_previous and bool(posts)
+        has_next = has_next and bool(posts)
+
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        page = self._get_page(posts, number, self)
+        page.next_cursor = (
+            encode_cursor(posts[-1], field) if has_next else ''
+        )
+        page.previous_cursor = (
+            encode_cursor(posts[0], field) if has_previous else ''
+        )
+        return page
+
+    page = get_page
+
+
+def table_stats_count(connection, table):
+    """Число строк таблицы из sqlite_stat1, если ANALYZE уже запускался."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                           [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row:
+        return None
+    return int(row[0].split()[0])
+
+
+def estimate_count(queryset):
+    """Оценивает число строк таблицы без полного COUNT(*).
+
+    Оценивается только выборка без фильтров: на PostgreSQL по плану
+    запроса, на остальных базах по статистике sqlite_stat1, а без неё
+    по наибольшему id, с кэшем на ESTIMATED_COUNT_TIMEOUT. Планировщик
+    ошибается на фильтрах в разы, поэтому для выборки с фильтрами
+    точный COUNT(*) считается один раз на ESTIMATED_COUNT_TIMEOUT
+    и берётся из кэша по тексту запроса. Там, где есть готовые
+    счётчики, число лучше передать паджинатору в `count`.
+    """
+    if queryset.query.where:
+        try:
+            sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+        return get_or_compute(QUERY_COUNT_KEY.format(digest=digest),
+                              queryset.count,
+                              settings.ESTIMATED_COUNT_TIMEOUT)
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+    table = queryset.model._meta.db_table
+    key = TABLE_COUNT_KEY.format(table=table)
+    count = cache.get(key)
+    if count is None:
+        if connection.vendor == 'sqlite':
+            count = table_stats_count(connection, table)
+        if count is None:
+            count = queryset.aggregate(last=Max('pk'))['last'] or 0
+        cache.set(key, count, settings.ESTIMATED_COUNT_TIMEOUT)
+    return count
+
+
+def refresh_table_stats(*models, using=DEFAULT_DB_ALIAS):
+    """Обновляет статистику, по которой estimate_count оценивает таблицы.
+
+    ANALYZE читает таблицу целиком, поэтому запускается в фоне,
+    вместе с пересчётом счётчиков, а не на запросах пользователей.
+    """
+    connection = connections[using]
+    tables = [model._meta.db_table for model in models]
+    if connection.vendor in ('postgresql', 'sqlite'):
+        with connection.cursor() as cursor:
+            for table in tables:
+                quoted = connection.ops.quote_name(table)
+                cursor.execute(f'ANALYZE {quoted}')
+    cache.delete_many([TABLE_COUNT_KEY.format(table=table)
+                       for table in tables])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Паджинатор, который не считает строки точно.
+
+    Число строк передаётся в `count` из готовых счётчиков или
+    оценивается estimate_count. Страница выбирается с одной лишней
+    строкой и поправляет оценку: номер за настоящим концом сводится
+    к последней странице, строки за концом оценки добавляют
+    следующую, а на последней странице число становится точным.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, count=None):
+        super().__init__(object_list, per_page, orphans,
+                         allow_empty_first_page)
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+    def set_count(self, count):
+        self.count = count
+        self.__dict__.pop('num_pages', None)
+
+    def validate_number(self, number):
+        """Номер за концом оценки не ошибка: его проверит сама страница."""
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        objects = list(self.object_list[bottom:top + 1])
+        if not objects and number > 1:
+            self.set_count(self.object_list[:bottom].count())
+            return self.page(self.num_pages)
+        if len(objects) > self.per_page:
+            self.set_count(max(self.count, top + 1))
+        else:
+            self.set_count(bottom + len(objects))
+        return self._get_page(objects[:self.per_page], number, self)
+
+
+class LazyPage(Page):
+    """Страница, которую паджинатор выбирает при первом обращении.
+
+    Нужна там, где HTML страницы обычно берётся из кэша: пока
+    к странице не обратились, запроса к базе нет.
+    """
+
+    def __init__(self, get_page):
+        self._get_page = get_page
+
+    @cached_property
+    def _page(self):
+        return self._get_page()
+
+    def __getattr__(self, name):
+        return getattr(self._page, name)
+
+
+def get_page_window(number, num_pages, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей и по краям, пропуски — None.
+
+    Длина окна не зависит от числа страниц, например для 7-й
+    из 100: [1, None, 5, 6, 7, 8, 9, None, 100].
+    """
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(range(1, num_pages + 1))
+    window = []
+    if number > on_each_side + on_ends + 2:
+        window += list(range(1, on_ends + 1)) + [None]
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends - 1:
+        end = number + on_each_side
+        tail = [None] + list(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        end = num_pages
+        tail = []
+    return window + list(range(start, end + 1)) + tail
+
+
+def get_page_obj(request, post_list, number, count=None, cursor=True,
+                 lazy=False):
+    """Возвращает готовый паджинатор для постов.
+
+    Число постов берётся из `count`, если оно известно из счётчиков,
+    иначе оценивается без COUNT(*) (см. EstimatedCountPaginator).
+    `cursor=False`
+    оставляет номера страниц для списков, упорядоченных не по дате;
+    для них в `page_window` кладётся окно номеров для шаблона.
+    С `lazy=True` возвращается LazyPage.
+    """
+    def get_page():
+        after = request.GET.get('after')
+        before = request.GET.get('before')
+        if cursor and (settings.POSTS_CURSOR_PAGINATION or after or before):
+            paginator = CursorPaginator(post_list, number, after, before)
+            return paginator.get_page()
+        paginator = EstimatedCountPaginator(post_list, number, count=count)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        page_obj.page_window = get_page_window(
+            page_obj.number,
+            paginator.num_pages,
+            settings.PAGINATOR_ON_EACH_SIDE
+        )
+        return page_obj
+
+    if lazy:
+        return LazyPage(get_page)
+    return get_page()
@@ -1,29 +1,35 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+from .counters import get_author_stats, get_group_stats
+from .feed import count_follow_feed, get_feed_queryset, get_follow_feed
+from .feed_cache import (feed_etag, get_author, get_group, post_detail_etag,
+                         profile_etag, render_post_cards, render_post_list)
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Comment, Follow
-from .utils import get_page_obj
-from yatube.settings import POSTS_PER_PAGE
+from .models import AuthorStats, Group, Post, Comment, Follow
+from .search import search_posts
+from .thumbnails import schedule_thumbnail
+from .utils import CursorPaginator, get_page_obj
+from yatube.settings import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 
 User = get_user_model()
-ordering_post_default = '-pub_date'
 
 
-@cache_page(20)
+@condition(etag_func=feed_etag)
 def index(request):
-    post_list = (Post.objects.select_related('group').all().
-                 order_by(ordering_post_default)
-                 )
-    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE)
+    post_list = get_feed_queryset()
+    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE, lazy=True)
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
     description = 'Это главная страница проекта Yatube'
     index = True
     context = {
         'page_obj': page_obj,
+        'post_list_html': render_post_list(request, page_obj),
         'title': title,
         'description': description,
         'index': index,
@@ -31,14 +37,15 @@ def index(request):
     return render(request, template, context)
 
 
+@condition(etag_func=feed_etag)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    post_list = (Post.objects.
-                 filter(group=group).
-                 order_by(ordering_post_default)
-                 )
-    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE)
+    group = get_group(slug)
+    post_list = get_feed_queryset().filter(group=group)
+    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE,
+                            get_group_stats(group).posts_count
+                            )
+    render_post_cards(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj
@@ -46,15 +53,37 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@condition(etag_func=feed_etag)
+def group_index(request):
+    """Каталог групп по готовой таблице активности, без GROUP BY."""
+    groups = Group.objects.select_related('stats').order_by('title')
+    page_obj = get_page_obj(request, groups, POSTS_PER_PAGE, cursor=False)
+    for group in page_obj:
+        group.activity = get_group_stats(group)
+    recent_ids = [pk for group in page_obj for pk in group.activity.recent_ids]
+    recent_posts = (Post.objects.
+                    only('id', 'text', 'pub_date').
+                    in_bulk(recent_ids)
+                    )
+    for group in page_obj:
+        group.recent_posts = [recent_posts[pk]
+                              for pk in group.activity.recent_ids
+                              if pk in recent_posts]
+    return render(request, 'posts/groups.html', {'page_obj': page_obj})
+
+
+@condition(etag_func=profile_etag)
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = (Post.objects.
-                 filter(author=author).
-                 order_by(ordering_post_default)
-                 )
-    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE)
-    posts_counter = Post.objects.filter(author=author).count()
+    author = get_author(username)
+    stats = (AuthorStats.objects.filter(user_id=author.pk).first()
+             or AuthorStats(user_id=author.pk))
+    post_list = get_feed_queryset().filter(author=author)
+    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE,
+                            stats.posts_count
+                            )
+    render_post_cards(page_obj)
+    posts_counter = stats.posts_count
     user = request.user
 
     following = False
@@ -69,23 +98,29 @@ def profile(request, username):
         'user': user,
         'page_obj': page_obj,
         'posts_counter': posts_counter,
+        'followers_counter': stats.followers_count,
         'following': following
     }
     return render(request, template, context)
 
 
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id
+    )
     title = post.text[:30]
-    posts_counter = Post.objects.filter(author=post.author).count()
-    comments = Comment.objects.filter(post=post_id)
+    posts_counter = get_author_stats(post.author).posts_count
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+    # Страница читается после сохранения, чтобы в ней был новый комментарий
+    comments = get_comments_page(request, post)
 
     context = {
         'post': post,
@@ -97,6 +132,38 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def get_comments_page(request, post):
+    """Очередная порция комментариев поста, от новых к старым."""
+    comment_list = Comment.objects.filter(post=post).select_related('author')
+    paginator = CursorPaginator(comment_list, COMMENTS_PER_PAGE,
+                                after=request.GET.get('after'),
+                                field='created'
+                                )
+    return paginator.get_page()
+
+
+def comment_list(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post),
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    post_list = search_posts(query)
+    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE, cursor=False)
+    render_post_cards(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -109,6 +176,8 @@ def post_create(request):
         form = form.save(commit=False)
         form.author = request.user
         form.save()
+        if form.image:
+            schedule_thumbnail(form)
         return redirect('posts:profile', request.user.username)
     return render(request, template, context)
 
@@ -132,6 +201,8 @@ def post_edit(request, post_id):
     }
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnail(post)
         return redirect('posts:post_detail', post_id)
     return render(request, template, context)
 
@@ -150,9 +221,11 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    authors = request.user.follower.all().values('author')
-    post_list = Post.objects.filter(author__in=authors)
-    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE)
+    post_list = get_follow_feed(request.user)
+    page_obj = get_page_obj(request, post_list, POSTS_PER_PAGE,
+                            count_follow_feed(request.user)
+                            )
+    render_post_cards(page_obj)
     title = 'Избранные авторы'
     description = ''
     if not page_obj:
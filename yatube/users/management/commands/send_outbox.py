@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди пачками через одно соединение.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Сколько писем отправлять за проход.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать постоянно, опрашивая очередь.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Пауза между проходами в секундах.')
+
+    def handle(self, *args, **options):
+        total_sent = total_retried = 0
+        while True:
+            sent, retried = send_pending(options['batch_size'])
+            total_sent += sent
+            total_retried += retried
+            if sent or retried:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено писем: {total_sent}, отложено: {total_retried}'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'В очереди'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Не отправлено')], default='pending', max_length=10, verbose_name='Статус'),
+        ),
+    ]
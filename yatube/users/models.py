@@ -0,0 +1,65 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    subject = models.CharField(verbose_name='Тема', max_length=255)
+    body = models.TextField(verbose_name='Текст')
+    html_body = models.TextField(verbose_name='HTML-версия', blank=True)
+    from_email = models.CharField(verbose_name='Отправитель',
+                                  max_length=254,
+                                  blank=True
+                                  )
+    recipients = models.TextField(verbose_name='Получатели',
+                                  help_text='Адреса через запятую'
+                                  )
+    status = models.CharField(verbose_name='Статус',
+                              max_length=10,
+                              choices=STATUSES,
+                              default=PENDING
+                              )
+    attempts = models.PositiveSmallIntegerField(verbose_name='Попыток',
+                                                default=0
+                                                )
+    next_attempt_at = models.DateTimeField(
+        verbose_name='Следующая попытка',
+        default=timezone.now
+    )
+    last_error = models.TextField(verbose_name='Последняя ошибка',
+                                  blank=True
+                                  )
+    created = models.DateTimeField(verbose_name='Дата создания',
+                                   auto_now_add=True
+                                   )
+    sent_at = models.DateTimeField(verbose_name='Дата отправки',
+                                   blank=True,
+                                   null=True
+                                   )
+
+    class Meta:
+        ordering = ('next_attempt_at',)
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outbox_status_next_idx'
+                         )
+        ]
+
+    def __str__(self):
+        return f'{self.subject} → {self.recipients}'
+
+    @property
+    def recipient_list(self):
+        return [email for email in self.recipients.split(',') if email]
@@ -0,0 +1,118 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(subject, body, recipient_list, from_email=None, html_body=''):
+    """Ставит письмо в очередь вместо отправки в запросе."""
+    return OutboxMessage.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body or '',
+        from_email=from_email or '',
+        recipients=','.join(recipient_list),
+    )
+
+
+def build_email(message, connection):
+    email = EmailMultiAlternatives(message.subject,
+                                   message.body,
+                                   message.from_email or None,
+                                   message.recipient_list,
+                                   connection=connection
+                                   )
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    return email
+
+
+def schedule_retry(message, error, now):
+    """Откладывает письмо с экспоненциальной задержкой.
+
+    После OUTBOX_MAX_ATTEMPTS попыток письмо помечается неотправленным.
+    """
+    message.attempts += 1
+    message.last_error = repr(error)
+    if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        message.status = OutboxMessage.FAILED
+    else:
+        message.status = OutboxMessage.PENDING
+        delay = settings.OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1)
+        message.next_attempt_at = now + timedelta(seconds=delay)
+    message.save(update_fields=('attempts', 'last_error', 'status',
+                                'next_attempt_at'))
+
+
+def claim_batch(batch_size, now):
+    """Забирает пачку писем себе и сразу фиксирует это в базе.
+
+    Письма переходят в статус SENDING до now + OUTBOX_CLAIM_TIMEOUT.
+    Если обработчик упадёт, после этого срока их заберёт следующий.
+    Строки выбираются с SKIP LOCKED там, где база это умеет.
+    """
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True).
+            filter(status__in=(OutboxMessage.PENDING, OutboxMessage.SENDING),
+                   next_attempt_at__lte=now).
+            order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        OutboxMessage.objects.filter(
+            pk__in=[message.pk for message in messages]
+        ).update(
+            status=OutboxMessage.SENDING,
+            next_attempt_at=now + timedelta(
+                seconds=settings.OUTBOX_CLAIM_TIMEOUT),
+        )
+    return messages
+
+
+def send_pending(batch_size=None):
+    """Отправляет пачку готовых писем через одно соединение.
+
+    Возвращает пару (отправлено, отложено). Письма сначала забираются
+    в короткой транзакции, а отправляются уже вне её: сетевые вызовы
+    не держат блокировку базы, и каждый результат записывается сразу.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    messages = claim_batch(batch_size, now)
+    if not messages:
+        return 0, 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        logger.exception('Почтовый сервер недоступен')
+        for message in messages:
+            schedule_retry(message, error, now)
+        return 0, len(messages)
+
+    sent = retried = 0
+    try:
+        for message in messages:
+            try:
+                build_email(message, connection).send()
+            except Exception as error:
+                logger.exception('Не удалось отправить письмо %s',
+                                 message.pk)
+                schedule_retry(message, error, now)
+                retried += 1
+            else:
+                OutboxMessage.objects.filter(pk=message.pk).update(
+                    status=OutboxMessage.SENT,
+                    sent_at=timezone.now(),
+                    last_error='',
+                )
+                sent += 1
+    finally:
+        connection.close()
+    return sent, retried
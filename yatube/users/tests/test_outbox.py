@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import OutboxMessage
+from ..outbox import enqueue, send_pending
+
+User = get_user_model()
+TEMP_EMAIL_PATH = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class CountingBackend(BaseEmailBackend):
+    """Запоминает, сколько писем ушло через каждое соединение."""
+    batches = []
+
+    def open(self):
+        self.count = 0
+
+    def close(self):
+        CountingBackend.batches.append(self.count)
+
+    def send_messages(self, email_messages):
+        self.count += len(email_messages)
+        return len(email_messages)
+
+
+class Crash(BaseException):
+    """Падение процесса посреди пачки, которое не ловит send_pending."""
+
+
+class CrashingBackend(BaseEmailBackend):
+    """Отправляет первое письмо и падает на втором."""
+    statuses = []
+
+    def send_messages(self, email_messages):
+        CrashingBackend.statuses.append(
+            list(OutboxMessage.objects.values_list('status', flat=True))
+        )
+        if len(CrashingBackend.statuses) > 1:
+            raise Crash
+        return len(email_messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+    EMAIL_FILE_PATH=TEMP_EMAIL_PATH,
+)
+class OutboxTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_EMAIL_PATH, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_EMAIL_PATH, ignore_errors=True)
+
+    def sent_files(self):
+        if not os.path.isdir(TEMP_EMAIL_PATH):
+            return []
+        return os.listdir(TEMP_EMAIL_PATH)
+
+    def test_signup_enqueues_welcome_email(self):
+        self.client.post(reverse('users:signup'), {
+            'username': 'new_user',
+            'email': 'new_user@example.com',
+            'password1': 'Pa55-word-long',
+            'password2': 'Pa55-word-long',
+        })
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.recipient_list, ['new_user@example.com'])
+        self.assertEqual(self.sent_files(), [])
+
+    def test_password_reset_enqueues_email(self):
+        User.objects.create_user(username='user',
+                                 email='user@example.com',
+                                 password='Pa55-word-long'
+                                 )
+        self.client.post(reverse('users:password_reset_form'),
+                         {'email': 'user@example.com'}
+                         )
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.PENDING)
+        self.assertIn('/reset/', message.body)
+        self.assertEqual(self.sent_files(), [])
+
+    @override_settings(EMAIL_BACKEND=f'{__name__}.CountingBackend')
+    def test_batch_is_sent_over_one_connection(self):
+        CountingBackend.batches = []
+        for i in range(3):
+            enqueue(f'Тема {i}', 'Текст', [f'to_{i}@example.com'])
+
+        self.assertEqual(send_pending(batch_size=2), (2, 0))
+        self.assertEqual(send_pending(batch_size=2), (1, 0))
+        self.assertEqual(send_pending(batch_size=2), (0, 0))
+
+        self.assertEqual(
+            OutboxMessage.objects.filter(status=OutboxMessage.SENT).count(),
+            3
+        )
+        self.assertEqual(CountingBackend.batches, [2, 1])
+
+    @override_settings(EMAIL_BACKEND=f'{__name__}.FailingBackend',
+                       OUTBOX_MAX_ATTEMPTS=2,
+                       OUTBOX_RETRY_DELAY=60,
+                       )
+    def test_failed_send_is_retried_with_backoff(self):
+        message = enqueue('Тема', 'Текст', ['to@example.com'])
+
+        self.assertEqual(send_pending(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.status, OutboxMessage.PENDING)
+        self.assertIn('SMTP', message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        self.assertEqual(send_pending(), (0, 0))
+
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending(), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.FAILED)
+
+    @override_settings(EMAIL_BACKEND=f'{__name__}.CrashingBackend',
+                       OUTBOX_CLAIM_TIMEOUT=60)
+    def test_crash_mid_batch_keeps_sent_messages(self):
+        CrashingBackend.statuses = []
+        first = enqueue('Первое', 'Текст', ['first@example.com'])
+        second = enqueue('Второе', 'Текст', ['second@example.com'])
+
+        with self.assertRaises(Crash):
+            send_pending()
+
+        self.assertEqual(CrashingBackend.statuses[0],
+                         [OutboxMessage.SENDING] * 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, OutboxMessage.SENT)
+        self.assertEqual(second.status, OutboxMessage.SENDING)
+        self.assertEqual(send_pending(), (0, 0))
+
+        OutboxMessage.objects.filter(pk=second.pk).update(
+            next_attempt_at=timezone.now()
+        )
+        with self.settings(
+            EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend'
+        ):
+            self.assertEqual(send_pending(), (1, 0))
+
+    def test_send_outbox_command(self):
+        enqueue('Тема', 'Текст', ['to@example.com'])
+        call_command('send_outbox', stdout=open(os.devnull, 'w'))
+
+        self.assertFalse(
+            OutboxMessage.objects.filter(status=OutboxMessage.PENDING).exists()
+        )
+        self.assertEqual(len(self.sent_files()), 1)
@@ -2,6 +2,7 @@ from django.contrib.auth.views import LoginView, LogoutView, PasswordResetView
 from django.urls import path
 
 from . import views
+from .forms import OutboxPasswordResetForm
 
 app_name = 'users'
 
@@ -19,7 +20,11 @@ urlpatterns = [
          name='login'
          ),
     path('password_reset_form/',
-         PasswordResetView.as_view(),
+         PasswordResetView.as_view(form_class=OutboxPasswordResetForm),
          name='password_reset_form'
          ),
+    path('password_reset/',
+         PasswordResetView.as_view(form_class=OutboxPasswordResetForm),
+         name='password_reset'
+         ),
 ]
@@ -1,17 +1,21 @@
-from django.core.mail import send_mail
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
 
 from .forms import CreationForm
+from .outbox import enqueue
 
 
 class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:index')
     template_name = 'users/signup.html'
-    send_mail('Тема письма',
-              'Текст письма.',
-              'from@example.com',
-              ['to@example.com'],
-              fail_silently=False,
-              )
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        user = self.object
+        if user.email:
+            enqueue('Добро пожаловать в Yatube',
+                    f'{user.username}, спасибо за регистрацию!',
+                    [user.email],
+                    )
+        return response
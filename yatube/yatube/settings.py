@@ -19,17 +19,27 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
+
+def env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'hvqk_-zk4h+&(b1x=x!ub8p1xo8afv-+(ho7eairfb7$&ei4!d'
+SECRET_KEY = os.getenv(
+    'SECRET_KEY', 'hvqk_-zk4h+&(b1x=x!ub8p1xo8afv-+(ho7eairfb7$&ei4!d'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DEBUG', True)
 
-ALLOWED_HOSTS = [
-    '127.0.0.1',
-    'testserver',
-    'gagai.pythonanywhere.com/'
-]
+if os.getenv('ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS').split(',')
+else:
+    ALLOWED_HOSTS = [
+        '127.0.0.1',
+        'testserver',
+        'gagai.pythonanywhere.com/'
+    ]
 
 
 # Application definition
@@ -46,10 +56,10 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar'
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,17 +67,27 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')   # Путь до папки templates
+
+# В продакшене шаблоны разбираются один раз на процесс (cached loader),
+# а при TEMPLATES_WARM_UP все шаблоны из templates/ компилируются
+# при старте WSGI-воркера, до первого запроса
+TEMPLATES_CACHED = env_bool('TEMPLATES_CACHED', not DEBUG)
+TEMPLATES_WARM_UP = env_bool('TEMPLATES_WARM_UP', TEMPLATES_CACHED)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
+        'APP_DIRS': not TEMPLATES_CACHED,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -80,17 +100,60 @@ TEMPLATES = [
     },
 ]
 
+if TEMPLATES_CACHED:
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# DB_ENGINE=postgresql включает PostgreSQL с постоянными соединениями
+# (DB_CONN_MAX_AGE секунд). DB_POOLER=pgbouncer — для работы через пул
+# соединений в режиме transaction pooling.
+
+if os.getenv('DB_ENGINE', 'sqlite3') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'yatube'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_POOLER') == 'pgbouncer'
+            ),
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME',
+                              os.path.join(BASE_DIR, 'db.sqlite3')
+                              ),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+            'OPTIONS': {
+                'timeout': 20,
+            },
+        }
+    }
+
+# PRAGMA, которые core выполняет на каждом новом соединении с SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 
@@ -130,10 +193,26 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
-# STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+STATIC_ROOT = os.getenv('STATIC_ROOT',
+                        os.path.join(BASE_DIR, 'collected_static')
+                        )
 STATIC_URL = '/static/'
 STATICFILES_DIRS = ['static/']
 
+# Имена файлов с хэшем содержимого и сжатые копии .gz/.br,
+# которые готовит collectstatic
+STATIC_MANIFEST = env_bool('STATIC_MANIFEST', not DEBUG)
+if STATIC_MANIFEST:
+    STATICFILES_STORAGE = 'core.static.CompressedManifestStaticFilesStorage'
+STATIC_COMPRESS_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.ico',
+                              '.txt', '.html', '.json', '.xml')
+STATIC_COMPRESS_MIN_SIZE = 256
+
+# Раздача STATIC_ROOT самим Django, когда перед ним нет веб-сервера;
+# файлы без хэша в имени кэшируются на STATIC_MAX_AGE секунд
+STATIC_SERVE = env_bool('STATIC_SERVE', not DEBUG)
+STATIC_MAX_AGE = 60 * 60
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -142,11 +221,50 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь писем: сколько отправлять за проход, сколько раз повторять
+# и базовая задержка повтора в секундах (растёт вдвое с каждой попыткой)
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+# Через сколько секунд письмо, взятое упавшим обработчиком, снова
+# становится доступно для отправки
+OUTBOX_CLAIM_TIMEOUT = 10 * 60
+
 
 # Posts app constants
 
 POSTS_PER_PAGE = 10
 
+# Сколько комментариев подгружается на странице поста за раз
+COMMENTS_PER_PAGE = 20
+
+# Сколько номеров страниц показывать по обе стороны от текущей
+PAGINATOR_ON_EACH_SIDE = 2
+
+# Сколько секунд кэшируются оценка числа строк таблицы и COUNT(*)
+# выборок с фильтрами для номеров страниц
+ESTIMATED_COUNT_TIMEOUT = 5 * 60
+
+# Пагинация по курсору (?after=/?before=) вместо номеров страниц
+POSTS_CURSOR_PAGINATION = False
+
+# Лента подписок: раскладка постов по лентам подписчиков при записи
+FOLLOW_FEED_FANOUT = False
+# Сколько записей хранится в ленте одного пользователя
+FOLLOW_FEED_MAX_LENGTH = 1000
+# Посты авторов с большим числом подписчиков собираются при чтении
+FOLLOW_FEED_FANOUT_LIMIT = 5000
+
+# Сколько последних постов показывать у группы в каталоге /groups/
+GROUP_DIRECTORY_RECENT_POSTS = 3
+
+# Время жизни закэшированного списка постов главной страницы;
+# новые посты сбрасывают кэш через версию ленты
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60
+# Время жизни закэшированной карточки поста; правки поста, автора
+# и группы сбрасывают её через версию карточки
+POSTS_CARD_CACHE_TIMEOUT = 24 * 60 * 60
+
 # Django default view constant redefinition
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -156,14 +274,57 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры картинок постов строятся в фоне после загрузки
+THUMBNAIL_SIZE = (960, 339)
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
 # Cache
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+# Общий для воркеров кэш в файле SQLite; при отладке — в памяти процесса
+CACHE_SHARED = env_bool('CACHE_SHARED', not DEBUG)
+
+if CACHE_SHARED:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': os.getenv('CACHE_LOCATION',
+                                  os.path.join(BASE_DIR, 'cache.sqlite3')
+                                  ),
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+            },
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }
+    }
+
+# Сколько секунд get_or_compute ждёт значение, которое считает
+# другой воркер, и как часто его проверяет
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_POLL = 0.05
+
+# Кэш в памяти процесса перед общим: размер, время жизни записей
+# и как долго воркер доверяет своей копии версий данных
+LOCAL_CACHE_MAX_ENTRIES = 1000
+LOCAL_CACHE_MAX_BYTES = 32 * 1024 * 1024
+LOCAL_CACHE_TIMEOUT = 30
+LOCAL_CACHE_STAMP_TIMEOUT = 1
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Метрики производительности по страницам, отдаются на /metrics/
+# по заголовку Authorization: Bearer METRICS_TOKEN или для адресов
+# из METRICS_ALLOWED_IPS (за прокси REMOTE_ADDR у всех один и тот же)
+PERFORMANCE_METRICS = env_bool('PERFORMANCE_METRICS', False)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [
+    address for address in os.getenv('METRICS_ALLOWED_IPS', '').split(',')
+    if address
+]
@@ -13,19 +13,32 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.static import serve_static
+from core.views import metrics_view
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
-    path('admin/', admin.site.urls)
+    path('api/v1/', include('posts.api_urls', namespace='api')),
+    path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
+if settings.STATIC_SERVE:
+    urlpatterns += (
+        re_path(r'^{}(?P<path>.+)$'.format(
+            re.escape(settings.STATIC_URL.lstrip('/'))), serve_static),
+    )
+
 handler403 = 'core.views.csrf_failure'
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.internal_server_error'